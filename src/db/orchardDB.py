@@ -4,9 +4,10 @@ import threading
 import logging
 import time
 import json 
+import contextlib
 
 from src.config.sync_config import MAX_RETRIES 
-from src.config.sync_states import SYNC_STATE_ERROR 
+from src.config.sync_states import SYNC_STATE_ERROR, SYNC_STATE_PENDING_PUSH
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +51,10 @@ CREATE TABLE IF NOT EXISTS shadows (
     etag TEXT,
     file_hash TEXT,
     modified_at INTEGER,
+    
+    -- Local file fingerprint at last sync (lets release() skip hashing unchanged files)
+    size INTEGER,
+    mtime_ns INTEGER,
     FOREIGN KEY(object_id) REFERENCES objects(id) ON DELETE CASCADE
 );
 
@@ -84,6 +89,12 @@ CREATE TABLE IF NOT EXISTS actions (
 CREATE INDEX IF NOT EXISTS idx_parent ON objects(parent_id);
 CREATE INDEX IF NOT EXISTS idx_actions_status ON actions(status);
 CREATE INDEX IF NOT EXISTS idx_actions_target ON actions(target_id);
+CREATE INDEX IF NOT EXISTS idx_objects_parent_deleted ON objects(parent_id, deleted);
+CREATE INDEX IF NOT EXISTS idx_objects_conflict ON objects(sync_state, name, id) WHERE sync_state = 'conflict';
+CREATE INDEX IF NOT EXISTS idx_actions_target_status ON actions(target_id, action_type, status);
+DROP INDEX IF EXISTS idx_actions_status_active; -- Superseded by actions_counters
+CREATE INDEX IF NOT EXISTS idx_actions_content_recent ON actions(target_id, created_at DESC)
+    WHERE action_type IN ('upload', 'update_content');
 
 CREATE TABLE IF NOT EXISTS chunk_cache (
     object_id TEXT,
@@ -92,8 +103,68 @@ CREATE TABLE IF NOT EXISTS chunk_cache (
     PRIMARY KEY (object_id, chunk_index),
     FOREIGN KEY(object_id) REFERENCES objects(id) ON DELETE CASCADE
 );
+
+-- Per-status action counts kept by triggers, so status displays read a row instead of counting
+CREATE TABLE IF NOT EXISTS actions_counters (
+    status TEXT PRIMARY KEY,
+    n INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_actions_count_insert AFTER INSERT ON actions BEGIN
+    INSERT INTO actions_counters (status, n) VALUES (NEW.status, 1)
+        ON CONFLICT(status) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_actions_count_delete AFTER DELETE ON actions BEGIN
+    UPDATE actions_counters SET n = n - 1 WHERE status = OLD.status;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_actions_count_update AFTER UPDATE OF status ON actions
+WHEN OLD.status IS NOT NEW.status BEGIN
+    UPDATE actions_counters SET n = n - 1 WHERE status = OLD.status;
+    INSERT INTO actions_counters (status, n) VALUES (NEW.status, 1)
+        ON CONFLICT(status) DO UPDATE SET n = n + 1;
+END;
 """
 
+# Per-connection tuning for many small queries from concurrent FUSE threads.
+# (busy timeout is already set via sqlite3.connect(timeout=...))
+CONNECTION_PRAGMAS = (
+    "synchronous=NORMAL",     # Safe with WAL, avoids an fsync per commit
+    "cache_size=-65536",      # 64MB page cache
+    "mmap_size=1073741824",   # Serve pages from the kernel page cache
+    "temp_store=MEMORY",
+    "journal_size_limit=67108864", # Truncate the WAL back to 64MB after checkpoints
+)
+
+# Columns added after the initial schema: table -> [(column, type)]
+# CREATE TABLE IF NOT EXISTS won't add these to existing databases.
+MIGRATIONS = {
+    'shadows': [('size', 'INTEGER'), ('mtime_ns', 'INTEGER')],
+    # The name the filesystem shows ("name.ext" for files), so path lookups can use an index
+    'objects': [('display_name', "TEXT GENERATED ALWAYS AS (CASE WHEN type = 'file' AND extension IS NOT NULL "
+                                 "AND extension != '' THEN name || '.' || extension ELSE name END) VIRTUAL")],
+    # Copy of metadata.file_hash for upload/update_content, so dedup checks skip the JSON
+    'actions': [('file_hash', 'TEXT')],
+}
+
+# Run once, right after the column is added: (table, column) -> SQL
+MIGRATION_BACKFILLS = {
+    ('actions', 'file_hash'): "UPDATE actions SET file_hash = json_extract(metadata, '$.file_hash') "
+                              "WHERE action_type IN ('upload', 'update_content')",
+}
+
+# Indexes over migrated columns, created once the columns exist
+MIGRATION_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_objects_parent_display ON objects(parent_id, display_name) WHERE deleted = 0;
+"""
+
+# count_actions() SQL by number of statuses, built once so repeated calls reuse the cached statement
+COUNT_ACTIONS_SQL = {
+    n: f"SELECT COALESCE(SUM(n), 0) AS c FROM actions_counters WHERE status IN ({','.join('?' * n)})"
+    for n in range(1, 6)
+}
+
 class OrchardDB:
     _instance = None
     _lock = threading.Lock()
@@ -101,6 +172,11 @@ class OrchardDB:
     def __init__(self, db_path):
         self.db_path = os.path.abspath(db_path)
         self.local_thread = threading.local()
+        # In-process wakeups for readers blocked on content the engine is fetching
+        self._content_cond = threading.Condition()
+        self._content_versions = {} # object_id -> bumped on every content change
+        self._listing_lock = threading.Lock()
+        self._listing_versions = {} # folder_id -> bumped whenever its children change
         self._init_db()
 
     def _init_db(self):
@@ -112,12 +188,18 @@ class OrchardDB:
         for attempt in range(3):
             try:
                 with sqlite3.connect(self.db_path, timeout=10.0) as conn:
-                    # Removed WAL mode for stability during fresh start
-                    # conn.execute("PRAGMA journal_mode=WAL;") 
+                    has_counters = conn.execute("SELECT 1 FROM sqlite_master WHERE name='actions_counters'").fetchone()
                     conn.executescript(SCHEMA)
+                    if not has_counters:
+                        # Seed the counters from actions queued before they existed
+                        conn.execute("INSERT INTO actions_counters (status, n) SELECT status, COUNT(*) FROM actions GROUP BY status")
+                    self._migrate(conn)
                     conn.execute("INSERT OR IGNORE INTO objects (id, type, name, parent_id) VALUES ('root', 'folder', 'root', NULL)")
                     conn.execute("INSERT OR IGNORE INTO objects (id, type, name, parent_id) VALUES ('drive_root', 'folder', 'Drive', 'root')")
                     conn.commit()
+                    # WAL lets FUSE readers proceed while the engine writes. Enabled only once
+                    # the schema exists (it persists in the DB file from then on).
+                    conn.execute("PRAGMA journal_mode=WAL")
                 break
             except sqlite3.OperationalError as e:
                 if "disk I/O error" in str(e) or "database is locked" in str(e):
@@ -126,6 +208,16 @@ class OrchardDB:
                         continue
                 raise e
 
+    def _migrate(self, conn):
+        for table, columns in MIGRATIONS.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+            for name, col_type in columns:
+                if name not in existing:
+                    logger.info(f"Migrating DB: adding {table}.{name}")
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+                    if (table, name) in MIGRATION_BACKFILLS: conn.execute(MIGRATION_BACKFILLS[(table, name)])
+        conn.executescript(MIGRATION_INDEXES)
+
     def add_chunk(self, object_id, chunk_index):
         """Marks a specific chunk as present locally."""
         self.execute("""
@@ -133,6 +225,25 @@ class OrchardDB:
             VALUES (?, ?, ?)
         """, (object_id, chunk_index, int(time.time())))
 
+    def add_chunks(self, object_id, chunk_indices):
+        """Marks several chunks as present locally in one transaction."""
+        now = int(time.time())
+        conn = self.get_conn()
+        conn.executemany("""
+            INSERT OR REPLACE INTO chunk_cache (object_id, chunk_index, last_accessed)
+            VALUES (?, ?, ?)
+        """, [(object_id, c, now) for c in chunk_indices])
+        self._commit(conn)
+
+    def mark_written(self, writes):
+        """Persists buffered write() metadata: writes is [(object_id, size, modified_at)], one transaction."""
+        conn = self.get_conn()
+        conn.executemany("""
+            UPDATE objects SET size = ?, local_modified_at = ?, dirty = 1, sync_state = ?
+            WHERE id = ?
+        """, [(size, modified_at, SYNC_STATE_PENDING_PUSH, object_id) for object_id, size, modified_at in writes])
+        self._commit(conn)
+
     def has_chunk(self, object_id, chunk_index):
         """Checks if a specific chunk is present."""
         row = self.fetchone("SELECT 1 FROM chunk_cache WHERE object_id=? AND chunk_index=?", (object_id, chunk_index))
@@ -143,18 +254,102 @@ class OrchardDB:
         rows = self.fetchall("SELECT chunk_index FROM chunk_cache WHERE object_id=?", (object_id,))
         return {r['chunk_index'] for r in rows}
 
+    def content_version(self, object_id):
+        with self._content_cond:
+            return self._content_versions.get(object_id, 0)
+
+    def notify_content(self, object_id):
+        """Wakes readers waiting on object_id (called after chunks/full file land on disk)."""
+        with self._content_cond:
+            self._content_versions[object_id] = self._content_versions.get(object_id, 0) + 1
+            self._content_cond.notify_all()
+
+    def wait_for_content(self, object_id, version, timeout):
+        """Blocks until object_id's content changes past version, or timeout. Returns True if it changed."""
+        with self._content_cond:
+            return self._content_cond.wait_for(lambda: self._content_versions.get(object_id, 0) != version, timeout)
+
+    def listing_version(self, folder_id):
+        with self._listing_lock:
+            return self._listing_versions.get(folder_id, 0)
+
+    def notify_children(self, *folder_ids):
+        """Marks the child listings of folder_ids as changed (call after the write)."""
+        with self._listing_lock:
+            for folder_id in folder_ids:
+                self._listing_versions[folder_id] = self._listing_versions.get(folder_id, 0) + 1
+
+    def increment_open_count(self, object_id):
+        """Atomically increments open_count (creating the cache row if missing). Returns the new count."""
+        conn = self.get_conn()
+        row = conn.execute("""
+            INSERT INTO drive_cache (object_id, open_count) VALUES (?, 1)
+            ON CONFLICT(object_id) DO UPDATE SET open_count = open_count + 1
+            RETURNING open_count
+        """, (object_id,)).fetchone()
+        self._commit(conn)
+        return row['open_count']
+
+    def decrement_open_count(self, object_id):
+        """Atomically decrements open_count. Returns the new count, or None if it was already 0."""
+        conn = self.get_conn()
+        row = conn.execute("""
+            UPDATE drive_cache SET open_count = open_count - 1
+            WHERE object_id = ? AND open_count > 0
+            RETURNING open_count
+        """, (object_id,)).fetchone()
+        self._commit(conn)
+        return row['open_count'] if row else None
+
+    def is_content_known(self, object_id, file_hash):
+        """True if file_hash matches the shadow or the newest pending upload/update for object_id."""
+        row = self.fetchone("""
+            SELECT 
+                (SELECT file_hash FROM shadows WHERE object_id = ?1) = ?2
+                OR (
+                    SELECT file_hash FROM actions 
+                    WHERE target_id = ?1 AND action_type IN ('upload', 'update_content') 
+                    AND status IN ('pending', 'processing', 'failed')
+                    ORDER BY created_at DESC LIMIT 1
+                ) = ?2 AS known
+        """, (object_id, file_hash))
+        return bool(row and row['known'])
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Groups the writes made on this thread into a single transaction and commit."""
+        conn = self.get_conn()
+        depth = getattr(self.local_thread, 'batch_depth', 0)
+        self.local_thread.batch_depth = depth + 1
+        try:
+            yield conn
+            if depth == 0: conn.commit()
+        except Exception:
+            if depth == 0: conn.rollback()
+            raise
+        finally:
+            self.local_thread.batch_depth = depth
+
+    def _commit(self, conn):
+        # Inside batch() the outermost block commits
+        if not getattr(self.local_thread, 'batch_depth', 0): conn.commit()
+
     def get_conn(self):
         if not hasattr(self.local_thread, 'conn'):
             # Connect with a reasonable timeout
-            self.local_thread.conn = sqlite3.connect(self.db_path, timeout=60.0)
-            self.local_thread.conn.row_factory = sqlite3.Row
+            # Larger statement cache: the FUSE layer reuses a few dozen fixed queries
+            conn = sqlite3.connect(self.db_path, timeout=60.0, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(f"PRAGMA {pragma}")
+            self.local_thread.conn = conn
         return self.local_thread.conn
 
     def execute(self, query, params=()):
         conn = self.get_conn()
         try:
             cur = conn.execute(query, params)
-            conn.commit()
+            self._commit(conn)
             return cur
         except sqlite3.OperationalError as e:
             if "database is locked" in str(e) or "disk I/O error" in str(e):
@@ -162,7 +357,7 @@ class OrchardDB:
                 time.sleep(0.1)
                 try:
                     cur = conn.execute(query, params)
-                    conn.commit()
+                    self._commit(conn)
                     return cur
                 except Exception as retry_e:
                     logger.error(f"DB Retry Failed: {retry_e}")
@@ -197,15 +392,15 @@ class OrchardDB:
                 return cur.fetchall()
             raise
 
-    def update_shadow(self, obj_id, cloud_id=None, parent_id=None, name=None, etag=None, file_hash=None, modified_at=None):
+    def update_shadow(self, obj_id, cloud_id=None, parent_id=None, name=None, etag=None, file_hash=None, modified_at=None, size=None, mtime_ns=None):
         conn = self.get_conn()
         exists = conn.execute("SELECT 1 FROM shadows WHERE object_id = ?", (obj_id,)).fetchone()
         
         if not exists:
             conn.execute("""
-                INSERT INTO shadows (object_id, cloud_id, parent_id, name, etag, file_hash, modified_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (obj_id, cloud_id, parent_id, name, etag, file_hash, modified_at))
+                INSERT INTO shadows (object_id, cloud_id, parent_id, name, etag, file_hash, modified_at, size, mtime_ns)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (obj_id, cloud_id, parent_id, name, etag, file_hash, modified_at, size, mtime_ns))
         else:
             fields, values = [], []
             if cloud_id is not None: fields.append("cloud_id = ?"); values.append(cloud_id)
@@ -214,11 +409,13 @@ class OrchardDB:
             if etag is not None: fields.append("etag = ?"); values.append(etag)
             if file_hash is not None: fields.append("file_hash = ?"); values.append(file_hash)
             if modified_at is not None: fields.append("modified_at = ?"); values.append(modified_at)
+            if size is not None: fields.append("size = ?"); values.append(size)
+            if mtime_ns is not None: fields.append("mtime_ns = ?"); values.append(mtime_ns)
             
             if fields:
                 values.append(obj_id)
                 conn.execute(f"UPDATE shadows SET {', '.join(fields)} WHERE object_id = ?", tuple(values))
-        conn.commit()
+        self._commit(conn)
 
     def get_shadow(self, obj_id):
         return self.fetchone("SELECT * FROM shadows WHERE object_id = ?", (obj_id,))
@@ -248,13 +445,13 @@ class OrchardDB:
             set_clause = ", ".join([f"{k} = ?" for k in updates.keys()])
             vals = list(updates.values()) + [action_id]
             conn.execute(f"UPDATE actions SET {set_clause} WHERE action_id = ?", tuple(vals))
-            conn.commit()
+            self._commit(conn)
             logger.info(f"Coalesced action {action_type} into {action_id} for {target_id}")
 
         def delete_and_exit(action_ids):
              placeholders = ",".join("?" * len(action_ids))
              conn.execute(f"DELETE FROM actions WHERE action_id IN ({placeholders})", tuple(action_ids))
-             conn.commit()
+             self._commit(conn)
              logger.info(f"Deleted actions {action_ids} due to {action_type} for {target_id}")
 
         # --- LOGIC START ---
@@ -268,6 +465,19 @@ class OrchardDB:
                     return 
             # If no duplicate found, fall through to enqueue
 
+        # SCENARIO: DOWNLOAD CHUNK (Deduplication)
+        # Skip if a queued/in-flight download already covers the requested chunk range.
+        if action_type == 'download_chunk':
+            first = meta_dict.get('chunk_index', 0)
+            last = first + meta_dict.get('chunk_count', 1) - 1
+            for row in pending_actions:
+                if row['action_type'] != 'download_chunk' or row['status'] == 'failed': continue
+                prev_meta = json.loads(row['metadata']) if row['metadata'] else {}
+                prev_first = prev_meta.get('chunk_index', 0)
+                prev_last = prev_first + prev_meta.get('chunk_count', 1) - 1
+                if prev_first <= first and last <= prev_last:
+                    return
+
         if action_type == 'delete':
             ids_to_delete = [row['action_id'] for row in pending_actions if row['status'] != 'processing']
             if ids_to_delete:
@@ -322,12 +532,12 @@ class OrchardDB:
                 
                 if prev_type == 'update_content':
                      prev_meta.update(meta_dict)
-                     update_and_exit(prev_id, {'metadata': json.dumps(prev_meta)})
+                     update_and_exit(prev_id, {'metadata': json.dumps(prev_meta), 'file_hash': prev_meta.get('file_hash')})
                      return
                 
                 if prev_type == 'upload':
                      prev_meta.update(meta_dict)
-                     update_and_exit(prev_id, {'metadata': json.dumps(prev_meta)})
+                     update_and_exit(prev_id, {'metadata': json.dumps(prev_meta), 'file_hash': prev_meta.get('file_hash')})
                      return
 
                 if prev_type in ('rename', 'move'): continue
@@ -336,10 +546,18 @@ class OrchardDB:
         # Standard Enqueue
         meta_json = json.dumps(meta_dict) if meta_dict else None
         conn.execute("""
-            INSERT INTO actions (target_id, action_type, direction, destination, metadata, priority, created_at, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'pending')
-        """, (target_id, action_type, direction, destination, meta_json, priority, int(time.time())))
-        conn.commit()
+            INSERT INTO actions (target_id, action_type, direction, destination, metadata, file_hash, priority, created_at, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending')
+        """, (target_id, action_type, direction, destination, meta_json, meta_dict.get('file_hash'), priority, int(time.time())))
+        self._commit(conn)
+
+    def count_actions(self, *statuses):
+        """Number of actions in the given statuses, read from the trigger-maintained counters."""
+        sql = COUNT_ACTIONS_SQL.get(len(statuses))
+        if sql is None:
+            sql = f"SELECT COALESCE(SUM(n), 0) AS c FROM actions_counters WHERE status IN ({','.join('?' * len(statuses))})"
+        row = self.fetchone(sql, statuses)
+        return row['c'] if row else 0
 
     def get_next_action(self):
         conn = self.get_conn()
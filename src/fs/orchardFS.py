@@ -4,7 +4,11 @@ import os
 import stat
 import time
 import hashlib
-import json
+import threading
+import functools
+import concurrent.futures
+import re
+from collections import OrderedDict
 import fuse 
 from fuse import FUSE, FuseOSError, Operations
 
@@ -16,6 +20,18 @@ logger = logging.getLogger(__name__)
 
 CHUNK_SIZE = 8 * 1024 * 1024
 PARTIAL_THRESHOLD = 32 * 1024 * 1024
+HASH_SLICE_SIZE = 8 * 1024 * 1024
+PATH_CACHE_SIZE = 8192
+NEG_CACHE_SIZE = 4096
+NEG_CACHE_TTL = 1.0 # seconds an ENOENT result is trusted
+DIRENTS_CACHE_SIZE = 256
+ATTR_CACHE_SIZE = 16384
+ATTR_CACHE_TTL = 1.0 # seconds a getattr result is served without touching the DB
+PULL_REQUEUE_AFTER = 30.0 # seconds before a folder pull that never completed is queued again
+WRITEBACK_INTERVAL = 1.0 # seconds write() metadata may stay buffered before it reaches the DB
+
+DIR_MODE = stat.S_IFDIR | 0o755
+FILE_MODE = stat.S_IFREG | 0o644
 
 IGNORED_PROCESSES = [
     'nautilus', 'nemo', 'caja', 'thunar', 'dolphin', 'konqueror', 'pcmanfm',
@@ -26,44 +42,239 @@ IGNORED_PROCESSES = [
     'glycin-thumbnailer', 'xreader-thumbnailer', 'gdk-pixbuf-thumbnailer',
     'mate-thumbnailer'
 ]
+# /proc/<pid>/comm holds the executable basename truncated to TASK_COMM_LEN - 1 (15) bytes
+IGNORED_COMMS = frozenset(p[:15].encode() for p in IGNORED_PROCESSES)
+def _trie_pattern(words):
+    """
+    Prefix-factored alternation ('ffmpeg|ffprobe' -> 'ff(?:mpeg|probe)') so the regex engine
+    tries each shared prefix once per position instead of once per word.
+    Only answers "does any word occur", so words extending a shorter word are dropped.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word: node = node.setdefault(ch, {})
+        node[''] = {}
+    def walk(node):
+        if '' in node: return ''
+        alts = [re.escape(ch) + walk(child) for ch, child in sorted(node.items())]
+        return alts[0] if len(alts) == 1 else '(?:' + '|'.join(alts) + ')'
+    return walk(trie)
+
+# One C-level scan of the raw cmdline instead of a Python loop over the list
+BLACKLIST_RE = re.compile(_trie_pattern(IGNORED_PROCESSES).encode())
+
+def _read_proc(pid, name):
+    try:
+        with open(f"/proc/{pid}/{name}", "rb") as f:
+            return f.read()
+    except Exception: return None
+
+def _process_starttime(pid):
+    """Field 22 of /proc/<pid>/stat; together with the pid it identifies a process across pid reuse."""
+    data = _read_proc(pid, 'stat')
+    if not data: return None
+    # comm (field 2) may contain spaces, so split after its closing paren
+    fields = data.rsplit(b')', 1)[-1].split()
+    return fields[19] if len(fields) > 19 else None
+
+@functools.lru_cache(maxsize=2048)
+def _is_blacklisted(pid, starttime):
+    # Fast path: exact basename match via comm
+    comm = _read_proc(pid, 'comm')
+    if comm and comm.rstrip(b'\n') in IGNORED_COMMS: return True
+    # Slow path: wrappers/interpreters only show the tool name in their cmdline
+    cmdline = _read_proc(pid, 'cmdline')
+    return bool(cmdline and BLACKLIST_RE.search(cmdline))
+
+@functools.lru_cache(maxsize=8192)
+def split_path(path):
+    """'/Drive/a/b' -> ('Drive', 'a', 'b'). Memoized: the kernel asks for the same paths back-to-back."""
+    parts = path.split('/')
+    if parts and parts[0] == '': parts = parts[1:]
+    if parts and parts[-1] == '': parts.pop()
+    if '' in parts: parts = [p for p in parts if p] # Rare: doubled slashes
+    return tuple(parts)
+
+class LRUCache:
+    """Thread-safe mapping bounded to maxsize entries, evicting the least recently used."""
+    def __init__(self, maxsize, initial=None):
+        self.maxsize = maxsize
+        self._data = OrderedDict(initial or {})
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data: return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize: self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def rekey_prefix(self, old_key, new_key):
+        """Moves old_key and every 'old_key/...' entry under new_key in one pass."""
+        old_prefix = old_key.rstrip('/') + '/'
+        new_prefix = new_key.rstrip('/') + '/'
+        with self._lock:
+            self._data = OrderedDict(
+                (new_prefix + k[len(old_prefix):] if k.startswith(old_prefix) else k, v)
+                for k, v in self._data.items() if k != old_key
+            )
 
 class OrchardFS(Operations):
     def __init__(self, db_path: str):
         self.db: OrchardDB = get_db(db_path)
         # Initialize root mapping
-        self.path_to_id = {'/': 'root', '/Drive': 'drive_root'} 
+        self.path_to_id = LRUCache(PATH_CACHE_SIZE, {'/': 'root', '/Drive': 'drive_root'})
+        self._neg_cache = {} # path -> monotonic expiry of a cached ENOENT
+        self._attr_cache = {} # path -> (monotonic expiry, attrs); dropped on local changes to the path
+        # folder_id -> (listing_version, monotonic deadline) of list_children pulls queued by readdir
+        self._inflight_pulls = {}
+        self._pull_lock = threading.Lock()
+        # folder_id -> ((last_synced, listing_version), dirents) for repeated ls of the same folder
+        self._dirents_cache = LRUCache(DIRENTS_CACHE_SIZE)
         self.id_to_path = {'root': '/', 'drive_root': '/Drive'}
-        self.handle_map = {} # fd -> object_id
-        self.fd = 0 
+        self._uid, self._gid = os.getuid(), os.getgid() # Constant for the process, used by getattr
+        # fd -> object_id, indexed directly by fd. Slot 0 is reserved so handles start at 1.
+        self._handles: list[str | None] = [None]
+        self._free_fds: list[int] = [] # Released fds available for reuse
+        # Parallel to _handles: (OS fd, content_version it was opened at) of the cache file
+        self._os_fds: list[tuple[int, int] | None] = [None]
+        self._fd_lock = threading.Lock() # FUSE dispatches from multiple threads
+        # object_id -> [sha256, next_offset] fed by sequential writes; None once writes go out of order
+        self._hashers = {}
+        self._hash_lock = threading.Lock() # Guards _hashers and each [sha256, next_offset] check-and-feed
+        # Full rehashes (after out-of-order writes) run here so close() doesn't wait on them
+        self._hash_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='orchard-hash')
+        # object_id -> generation of its latest dirty last-close release. A queued hash result only
+        # counts if no newer release came after it, so a slow rehash can't overwrite a newer one.
+        self._content_gens = {}
+        self._content_lock = threading.Lock()
+        # object_id -> (size, modified_at) from write(), flushed in batches instead of per write
+        self._pending_writes = {}
+        self._truncations = {} # object_id -> truncate() count, so write() can tell one raced it
+        self._pending_lock = threading.Lock() # Also held across truncate()'s ftruncate
+        threading.Thread(target=self._writeback_loop, daemon=True).start()
         logger.info(f"OrchardFS initialized. DB: {db_path}")
         os.makedirs(ORCHARD_CACHE_DIR, exist_ok=True)
         
         # Reset open counts on startup (crash recovery)
         self.db.execute("UPDATE drive_cache SET open_count = 0")
 
+    def _alloc_fd(self, obj_id):
+        with self._fd_lock:
+            fd = self._free_fds.pop() if self._free_fds else len(self._handles)
+            if fd == len(self._handles):
+                self._handles.append(obj_id)
+                self._os_fds.append(None)
+            else:
+                self._handles[fd] = obj_id
+            return fd
+
+    def _free_fd(self, fh):
+        """Releases a handle and returns the object_id it pointed to (or None)."""
+        with self._fd_lock:
+            if not (0 < fh < len(self._handles)): return None
+            obj_id = self._handles[fh]
+            if obj_id is not None:
+                self._handles[fh] = None
+                self._free_fds.append(fh)
+            cached, self._os_fds[fh] = self._os_fds[fh], None
+        if cached is not None: os.close(cached[0])
+        return obj_id
+
+    def _os_fd(self, fh, obj):
+        """
+        Returns a persistent OS fd on the cache file for handle fh, for pread/pwrite.
+        Only fully present files (present=1) are cached: downloads replace the cache
+        file via rename, so a fd opened on a missing/partial file could go stale.
+        The engine bumps the content version whenever it lands new content (os.replace
+        of a download included), and a fd opened at an older version is reopened.
+        """
+        version = self.db.content_version(obj.id) # Before open(): a replace racing it forces a reopen
+        with self._fd_lock:
+            if not (0 < fh < len(self._handles)) or self._handles[fh] != obj.id: return None
+            cached = self._os_fds[fh]
+            if cached is not None and (obj.local.present != 1 or cached[1] != version):
+                self._os_fds[fh] = None
+                os.close(cached[0])
+                cached = None
+            if obj.local.present != 1: return None
+            if cached is None:
+                try: os_fd = os.open(obj.get_local_full_path(), os.O_RDWR)
+                except OSError: return None
+                # Reads through a handle are mostly sequential: let the kernel read ahead further
+                os.posix_fadvise(os_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                cached = self._os_fds[fh] = (os_fd, version)
+            return cached[0]
+
+    def _feed_hash(self, obj_id, data, offset):
+        """Feeds sequential writes into a running SHA-256 so release() can skip the re-read."""
+        # Locked: two racing writes at one offset must not both pass the check and feed twice
+        with self._hash_lock:
+            if obj_id not in self._hashers:
+                self._hashers[obj_id] = [hashlib.sha256(), 0] if offset == 0 else None
+            state = self._hashers[obj_id]
+            if state is None: return
+            if offset != state[1]:
+                self._hashers[obj_id] = None # Non-sequential, fall back to full rehash
+                return
+            state[0].update(data)
+            state[1] += len(data)
+
+    def _writeback_loop(self):
+        while True:
+            time.sleep(WRITEBACK_INTERVAL)
+            try: self._flush_writes()
+            except Exception as e: logger.error(f"Write-back flush failed: {e}")
+
+    def _flush_writes(self, obj_id=None):
+        """Persists buffered write() metadata for obj_id (or every object) in one transaction."""
+        with self._pending_lock:
+            if obj_id is None:
+                pending, self._pending_writes = self._pending_writes, {}
+            else:
+                entry = self._pending_writes.pop(obj_id, None)
+                pending = {obj_id: entry} if entry else {}
+        if pending:
+            self.db.mark_written([(oid, size, mtime) for oid, (size, mtime) in pending.items()])
+
     def _calculate_hash(self, path):
-        if not os.path.exists(path): return None
+        """
+        (sha256 hexdigest, (st_size, st_mtime_ns) the hash describes) or None if the file is gone.
+        The fingerprint is None if the file changed while it was being read.
+        """
         sha256 = hashlib.sha256()
-        with open(path, 'rb') as f:
-            while True:
-                data = f.read(65536)
-                if not data: break
-                sha256.update(data)
-        return sha256.hexdigest()
-
-    def _get_process_name(self, pid):
+        # Buffered reads into one reusable slice-sized buffer: few update() calls, each handing
+        # OpenSSL a big contiguous block. Not mmap: the cache file can shrink mid-hash (editor
+        # save, truncate(), engine rewrite) and a shrunk mapping kills the daemon with SIGBUS.
+        buf = bytearray(HASH_SLICE_SIZE)
+        view = memoryview(buf)
         try:
-            with open(f"/proc/{pid}/cmdline", "rb") as f:
-                return f.read().replace(b'\x00', b' ').decode('utf-8', errors='ignore').strip()
-        except Exception: return None
+            with open(path, 'rb', buffering=0) as f:
+                before = os.fstat(f.fileno())
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                while n := f.readinto(buf):
+                    sha256.update(view[:n])
+                after = os.fstat(f.fileno())
+        except FileNotFoundError: return None
+        finally:
+            view.release()
+        fingerprint = (before.st_size, before.st_mtime_ns)
+        return sha256.hexdigest(), fingerprint if fingerprint == (after.st_size, after.st_mtime_ns) else None
 
     def _is_blacklisted_process(self, pid):
-        cmdline = self._get_process_name(pid)
-        if not cmdline: return False
-        for proc in IGNORED_PROCESSES:
-            if proc in os.path.basename(cmdline.split(' ')[0]) or proc in cmdline:
-                return True
-        return False
+        starttime = _process_starttime(pid)
+        if starttime is None: return False # Process already gone
+        return _is_blacklisted(pid, starttime)
 
     def _resolve(self, path: str) -> OrchardObject | None:
         """
@@ -73,15 +284,22 @@ class OrchardFS(Operations):
 
         # 1. Quick Cache Hit
         if path == '/': return OrchardObject.load(self.db, 'root')
-        if path in self.path_to_id:
-             obj = OrchardObject.load(self.db, self.path_to_id[path])
+        obj_id = self.path_to_id.get(path)
+        if obj_id:
+             obj = OrchardObject.load(self.db, obj_id)
              if obj and not getattr(obj, 'deleted', 0): return obj
              else: 
                  # Cache is stale or object deleted
-                 del self.path_to_id[path]
+                 self.path_to_id.pop(path)
+
+        # 1b. Negative Cache: recently confirmed missing (thumbnailers probing .nomedia etc.)
+        expiry = self._neg_cache.get(path)
+        if expiry:
+            if expiry > time.monotonic(): return None
+            self._neg_cache.pop(path, None)
 
         # 2. Iterative Resolution (Traverse from Root)
-        parts = [p for p in path.strip('/').split('/') if p]
+        parts = split_path(path)
         if not parts: return OrchardObject.load(self.db, 'root')
 
         # Start at root
@@ -97,25 +315,36 @@ class OrchardFS(Operations):
         if not current_obj: return None
         self.path_to_id[current_path or '/'] = current_obj.id
 
-        # Traverse remaining parts
+        # 3. Walk the remaining parts in one recursive query
+        remaining = parts[start_idx:]
+        if remaining and not any(p.endswith('.') for p in remaining):
+            chain = self._walk_chain(current_obj.id, remaining)
+            for part, child_id in zip(remaining, chain):
+                current_path = f"{current_path}/{part}"
+                self.path_to_id[current_path] = child_id
+            if len(chain) < len(remaining):
+                logger.debug(f"Failed to resolve '{remaining[len(chain)]}' in {current_path or '/'}")
+                self._remember_missing(path)
+                return None
+            return OrchardObject.load(self.db, chain[-1])
+
+        # Fallback: trailing-dot parts ("name." for an extensionless file) need a second lookup each
         for i in range(start_idx, len(parts)):
             part = parts[i]
             
-            # Find child by name in DB, ensuring it is NOT deleted
-            # Uses COALESCE to safely handle NULL extensions
-            row = self.db.fetchone("""
-                SELECT id FROM objects 
-                WHERE parent_id = ? 
-                AND deleted = 0
-                AND (
-                    name = ? 
-                    OR (name || '.' || COALESCE(extension, '')) = ?
-                    OR (name || '.' || COALESCE(extension, '')) = ? || '.'
-                )
-            """, (current_obj.id, part, part, part))
+            # Find child by display name in DB, ensuring it is NOT deleted (index probe)
+            row = self.db.fetchone(
+                "SELECT id FROM objects WHERE parent_id = ? AND display_name = ? AND deleted = 0",
+                (current_obj.id, part))
+            # "name." also addresses a file with no extension
+            if not row and part.endswith('.'):
+                row = self.db.fetchone(
+                    "SELECT id FROM objects WHERE parent_id = ? AND display_name = ? AND deleted = 0",
+                    (current_obj.id, part[:-1]))
             
             if not row:
                 logger.debug(f"Failed to resolve '{part}' in {current_obj.id} ({current_path})")
+                self._remember_missing(path)
                 return None
             
             child_id = row['id']
@@ -126,26 +355,79 @@ class OrchardFS(Operations):
             
         return current_obj
 
+    def _walk_chain(self, parent_id, parts):
+        """
+        Ids along `parts` below parent_id, resolved in a single recursive query.
+        Stops at the first missing component, so a short result means ENOENT.
+        """
+        values = ', '.join(['(?, ?)'] * len(parts))
+        params = [v for idx, part in enumerate(parts) for v in (idx, part)]
+        rows = self.db.fetchall(f"""
+            WITH RECURSIVE parts(idx, part) AS (VALUES {values}),
+            walk(depth, id, parent) AS (
+                SELECT 0, ?, NULL
+                UNION ALL
+                SELECT w.depth + 1, o.id, w.id FROM walk w
+                JOIN parts p ON p.idx = w.depth
+                JOIN objects o ON o.parent_id = w.id AND o.display_name = p.part AND o.deleted = 0
+            )
+            SELECT depth, id, parent FROM walk WHERE depth > 0 ORDER BY depth DESC
+        """, (*params, parent_id))
+        if not rows: return []
+        # Duplicate names can branch the walk; follow one branch back up from the deepest hit
+        parents = {r['id']: r['parent'] for r in rows}
+        chain = [rows[0]['id']]
+        for _ in range(rows[0]['depth'] - 1):
+            chain.append(parents[chain[-1]])
+        chain.reverse()
+        return chain
+
+    def _claim_pull(self, folder_id):
+        """
+        True if readdir should queue a pull for folder_id. Concurrent listings of a stale folder
+        queue it once; the claim ends when the pull lands (listing version bumps) or times out.
+        """
+        version = self.db.listing_version(folder_id)
+        now = time.monotonic()
+        with self._pull_lock:
+            inflight = self._inflight_pulls.get(folder_id)
+            if inflight and inflight[0] == version and inflight[1] > now: return False
+            self._inflight_pulls[folder_id] = (version, now + PULL_REQUEUE_AFTER)
+            return True
+
+    def _remember_missing(self, path):
+        if len(self._neg_cache) >= NEG_CACHE_SIZE: self._neg_cache.clear()
+        self._neg_cache[path] = time.monotonic() + NEG_CACHE_TTL
+
     # --- FUSE Operations ---
 
     def getattr(self, path, fh=None):
         # logger.debug(f"getattr: {path}")
+        cached = self._attr_cache.get(path)
+        if cached and cached[0] > time.monotonic(): return cached[1]
+
         obj = self._resolve(path)
         if not obj: raise FuseOSError(errno.ENOENT)
         
+        now = int(time.time())
+        local = obj.local
         attrs = {
-            'st_uid': os.getuid(), 'st_gid': os.getgid(),
-            'st_atime': obj.local.last_accessed or int(time.time()),
-            'st_mtime': obj.local.modified_at or int(time.time()),
-            'st_ctime': max(obj.local.modified_at or 0, obj.local.last_accessed or 0) or int(time.time()),
-            'st_nlink': 2 if obj.type == 'folder' else 1
+            'st_uid': self._uid, 'st_gid': self._gid,
+            'st_atime': local.last_accessed or now,
+            'st_mtime': local.modified_at or now,
+            'st_ctime': max(local.modified_at or 0, local.last_accessed or 0) or now,
         }
         if obj.type == 'folder':
-            attrs['st_mode'] = (stat.S_IFDIR | 0o755)
+            attrs['st_mode'] = DIR_MODE
+            attrs['st_nlink'] = 2
             attrs['st_size'] = 4096
         else:
-            attrs['st_mode'] = (stat.S_IFREG | 0o644)
-            attrs['st_size'] = obj.local.size
+            attrs['st_mode'] = FILE_MODE
+            attrs['st_nlink'] = 1
+            pending = self._pending_writes.get(obj.id) # Buffered write() not flushed yet
+            attrs['st_size'] = pending[0] if pending else local.size
+        if len(self._attr_cache) >= ATTR_CACHE_SIZE: self._attr_cache.clear()
+        self._attr_cache[path] = (time.monotonic() + ATTR_CACHE_TTL, attrs)
         return attrs
 
     def readdir(self, path, fh):
@@ -161,9 +443,11 @@ class OrchardFS(Operations):
         if (int(time.time()) - last_synced) > 60:
              # Only queue if not root (root syncs on start)
              if obj.id != 'root': 
-                logger.info(f"Queueing list_children for {obj.id}")
-                # High priority (20) to jump ahead of background tasks
-                self.db.enqueue_action(obj.id, 'list_children', 'pull', priority=20) 
+                # Concurrent listings of the same stale folder queue a single pull
+                if self._claim_pull(obj.id):
+                    logger.info(f"Queueing list_children for {obj.id}")
+                    # High priority (20) to jump ahead of background tasks
+                    self.db.enqueue_action(obj.id, 'list_children', 'pull', priority=20) 
                 
                 # If never synced (0), BLOCK until data arrives
                 if last_synced == 0:
@@ -176,22 +460,22 @@ class OrchardFS(Operations):
                              logger.info(f"Sync complete for {path}. Proceeding.")
                              break
 
-        dirents = ['.', '..']
-        
+        # Serve the cached listing until the folder is re-pulled or its children change.
+        # Read the version before querying so a concurrent change can't be cached as current.
+        version = (last_synced, self.db.listing_version(obj.id))
+        cached = self._dirents_cache.get(obj.id)
+        if cached and cached[0] == version: return cached[1]
+
         # We need to query children from DB now, EXCLUDING deleted items
+        # Display names (name.ext for files) come from the generated display_name column
         children = self.db.fetchall("""
-            SELECT name, extension, type 
-            FROM objects 
+            SELECT display_name FROM objects 
             WHERE parent_id = ? AND deleted = 0
         """, (obj.id,))
         
-        for child in children:
-            name = child['name']
-            if child['type'] == 'file' and child['extension']:
-                name = f"{name}.{child['extension']}"
-            dirents.append(name)
-            
-        for r in dirents: yield r
+        dirents = ['.', '..'] + [r[0] for r in children]
+        self._dirents_cache[obj.id] = (version, dirents)
+        return dirents
 
     def open(self, path, flags):
         obj = self._resolve(path)
@@ -213,15 +497,13 @@ class OrchardFS(Operations):
                       # Large File -> Sparse Init
                       obj.create_sparse_placeholder()
             
-            obj.local.open_count += 1
-            obj.update_cache_entry()
+            obj.local.open_count = self.db.increment_open_count(obj.id) # Atomic, like release()'s decrement
         
-        self.fd += 1
-        self.handle_map[self.fd] = obj.id
-        return self.fd
+        return self._alloc_fd(obj.id)
 
     def create(self, path, mode, fi=None):
         parent_path, name = os.path.split(path)
+        self._neg_cache.pop(path, None)
         
         # Filter temp files
         if name.startswith('.goutputstream') or name.startswith('.Trash') or name.startswith('._'):
@@ -231,22 +513,22 @@ class OrchardFS(Operations):
             
             # We still need a DB object to track the file handle
             new_obj = DriveFile.create_new_file(self.db, parent_obj.id, name)
-            self.fd += 1
-            self.handle_map[self.fd] = new_obj.id
-            return self.fd
+            # Still a new dirent: GIO lists the folder before renaming it over the target
+            self.db.notify_children(parent_obj.id)
+            return self._alloc_fd(new_obj.id)
 
         parent_obj = self._resolve(parent_path)
         if not parent_obj or parent_obj.type != 'folder': raise FuseOSError(errno.ENOENT)
 
-        new_obj = DriveFile.create_new_file(self.db, parent_obj.id, name)
-        # We don't queue upload here immediately. We wait for release() to capture content.
-        # But we can queue a 'touch' or empty upload if needed.
-        # For coalescing safety, queuing upload now is fine, release will update metadata.
-        self.db.enqueue_action(new_obj.id, 'upload', 'push', metadata={'name': name})
+        with self.db.batch(): # Row + cache entry + action in one commit
+            new_obj = DriveFile.create_new_file(self.db, parent_obj.id, name)
+            # We don't queue upload here immediately. We wait for release() to capture content.
+            # But we can queue a 'touch' or empty upload if needed.
+            # For coalescing safety, queuing upload now is fine, release will update metadata.
+            self.db.enqueue_action(new_obj.id, 'upload', 'push', metadata={'name': name})
+        self.db.notify_children(parent_obj.id)
         
-        self.fd += 1
-        self.handle_map[self.fd] = new_obj.id
-        return self.fd
+        return self._alloc_fd(new_obj.id)
 
     def read(self, path, size, offset, fh):
         obj = self._resolve(path)
@@ -267,26 +549,42 @@ class OrchardFS(Operations):
             missing = [c for c in needed_chunks if c not in present_chunks]
 
             if missing:
-                # Enqueue actions for missing chunks
-                for c in missing:
+                # Enqueue one ranged download per run of adjacent missing chunks
+                run_start = prev = missing[0]
+                for c in missing[1:] + [None]:
+                    if c is not None and c == prev + 1:
+                        prev = c
+                        continue
+                    self.db.enqueue_action(
+                        obj.id, 'download_chunk', 'pull',
+                        metadata={'chunk_index': run_start, 'chunk_count': prev - run_start + 1}, priority=10
+                    )
+                    if c is not None: run_start = prev = c
+
+                # Readahead: fetch the next chunk in parallel so sequential readers don't stall at each boundary
+                ahead = end_chunk + 1
+                if ahead * CHUNK_SIZE < obj.local.size and ahead not in present_chunks:
                     self.db.enqueue_action(
                         obj.id, 'download_chunk', 'pull',
-                        metadata={'chunk_index': c}, priority=10
+                        metadata={'chunk_index': ahead, 'chunk_count': 1}, priority=5
                     )
                 
-                # Blocking Wait Loop
+                # Blocking Wait: sleep until the engine signals new content for this object
                 # Timeout: 30s
-                for _ in range(60): 
-                    # Refresh state
+                deadline = time.monotonic() + 30
+                while True:
+                    version = self.db.content_version(obj.id)
                     row = self.db.fetchone("SELECT present_locally FROM drive_cache WHERE object_id=?", (obj.id,))
                     if row and row['present_locally'] == 1: break # Full download completed
                     
                     present_chunks = self.db.get_present_chunks(obj.id)
                     if all(c in present_chunks for c in missing): break
                     
-                    time.sleep(0.5)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0: break
+                    self.db.wait_for_content(obj.id, version, remaining)
 
-        try: return obj.read_local(size, offset)
+        try: return obj.read_local(size, offset, fd=self._os_fd(fh, obj))
         except: raise FuseOSError(errno.EIO)
 
     def write(self, path, data, offset, fh):
@@ -294,7 +592,25 @@ class OrchardFS(Operations):
         if not isinstance(obj, DriveFile): raise FuseOSError(errno.EISDIR)
         
         if not obj.local.present: obj.create_local_placeholder()
-        ret = obj.write_local(data, offset)
+        # Size tracked by earlier buffered writes lets write_local skip its fstat
+        with self._pending_lock:
+            pending = self._pending_writes.get(obj.id)
+            truncations = self._truncations.get(obj.id, 0)
+        fd = self._os_fd(fh, obj)
+        ret = obj.write_local(data, offset, fd=fd, known_size=pending[0] if pending else None)
+        self._feed_hash(obj.id, data, offset)
+        # Size/dirty reach the DB via the write-back flush (or release), not per write.
+        # The size is settled under the lock against the current entry, not the one read above.
+        with self._pending_lock:
+            if self._truncations.get(obj.id, 0) != truncations:
+                # A truncate() landed during this write: only the file knows which came last
+                size = (os.fstat(fd) if fd is not None else os.stat(obj.get_local_full_path())).st_size
+            else:
+                entry = self._pending_writes.get(obj.id)
+                size = max(entry[0], obj.local.size) if entry else obj.local.size
+            obj.local.size = size
+            self._pending_writes[obj.id] = (size, int(time.time()))
+        self._attr_cache.pop(path, None)
         # Note: We removed the enqueue_action here. We do it in release()
         return ret
 
@@ -305,8 +621,18 @@ class OrchardFS(Operations):
         path_loc = obj.get_local_full_path()
         if not os.path.exists(path_loc): obj.create_local_placeholder()
         
-        with open(obj.get_local_full_path(), 'r+b') as f:
+        # Under the lock, so a racing write() either sees this truncate or settles its size after it
+        with self._pending_lock, open(obj.get_local_full_path(), 'r+b') as f:
             f.truncate(length)
+            self._truncations[obj.id] = self._truncations.get(obj.id, 0) + 1
+            self._pending_writes[obj.id] = (length, int(time.time()))
+        self._attr_cache.pop(path, None)
+        
+        # Keep the running hash only if it still describes the whole file
+        with self._hash_lock:
+            state = self._hashers.get(obj.id)
+            if length == 0: self._hashers[obj.id] = [hashlib.sha256(), 0]
+            elif not state or state[1] != length: self._hashers[obj.id] = None
         
         obj.local.size = length
         obj.local.dirty = 1
@@ -314,7 +640,9 @@ class OrchardFS(Operations):
 
     def release(self, path, fh):
         """Called when file is closed. Checks for changes and queues upload."""
-        obj_id = self.handle_map.pop(fh, None)
+        obj_id = self._free_fd(fh)
+        if obj_id: self._flush_writes(obj_id) # So the load below sees this handle's writes
+        self._attr_cache.pop(path, None)
         if obj_id:
             obj = OrchardObject.load(self.db, obj_id)
         else:
@@ -322,11 +650,16 @@ class OrchardFS(Operations):
 
         if not isinstance(obj, DriveFile): return 0
         
-        # Decrement Open Count
-        if obj.local.open_count > 0:
-            obj.local.open_count -= 1
-            obj.update_cache_entry()
+        # Decrement Open Count (atomic, so concurrent closes can't both see the last handle)
+        open_count = self.db.decrement_open_count(obj.id)
+        if open_count is not None:
+            obj.local.open_count = open_count
             if obj.local.dirty: obj.commit() # Only persist if dirty
+
+        # Last handle closed: take ownership of the running hash (if any)
+        hash_state = None
+        if not obj.local.open_count:
+            with self._hash_lock: hash_state = self._hashers.pop(obj.id, None)
             
         # Ignore temp files
         if obj.local.name.startswith('.goutputstream') or obj.local.name.startswith('.Trash') or obj.local.name.startswith('._'):
@@ -345,50 +678,72 @@ class OrchardFS(Operations):
             logger.info(f"Skipping upload for {obj.id}: File still open (count={obj.local.open_count})")
             return 0
 
+        # Supersedes any rehash still running for an earlier release of this file
+        with self._content_lock:
+            gen = self._content_gens[obj.id] = self._content_gens.get(obj.id, 0) + 1
+
         local_path = obj.get_local_full_path()
-        if not os.path.exists(local_path): return 0
+        try: st = os.stat(local_path)
+        except FileNotFoundError: return 0
 
-        # 1. Calculate Hash & Size
-        file_hash = self._calculate_hash(local_path)
-        
-        # 2. Check Shadow (Optimization for synced files)
+        # 0. Fingerprint: size+mtime unchanged since last sync means content is unchanged
         shadow = self.db.get_shadow(obj.id)
-        if shadow and shadow['file_hash'] == file_hash:
-            return 0 
-
-        # 3. Check Pending Actions (Optimization for offline/syncing files)
-        # If we already have a pending upload/update for this file with the same content, skip.
-        pending = self.db.fetchall("""
-            SELECT metadata FROM actions 
-            WHERE target_id = ? AND action_type IN ('upload', 'update_content') 
-            AND status IN ('pending', 'processing', 'failed')
-            ORDER BY created_at DESC LIMIT 1
-        """, (obj.id,))
-        
-        if pending:
-            try:
-                meta = json.loads(pending[0]['metadata'])
-                if meta.get('file_hash') == file_hash:
-                    return 0 # Duplicate action, skip
-            except: pass
-
-        # 4. Queue Action
-        self.db.enqueue_action(
-            obj.id, 'update_content', 'push', 
-            metadata={'file_hash': file_hash, 'name': obj.local.name}
-        )
+        if shadow and shadow['size'] == st.st_size and shadow['mtime_ns'] == st.st_mtime_ns:
+            return 0
+
+        # 1. Reuse the running hash if it covered the whole file, otherwise rehash in the background
+        if hash_state and hash_state[1] == st.st_size:
+            self._queue_content_update(obj.id, obj.local.name, hash_state[0].hexdigest(), (st.st_size, st.st_mtime_ns), gen)
+        else:
+            self._hash_pool.submit(self._rehash_and_queue, obj.id, obj.local.name, local_path, gen)
         return 0
 
+    def _rehash_and_queue(self, obj_id, name, local_path, gen):
+        try:
+            with self._content_lock:
+                if self._content_gens.get(obj_id) != gen: return # A newer release took over
+            result = self._calculate_hash(local_path)
+            if result: self._queue_content_update(obj_id, name, *result, gen)
+        except Exception as e:
+            logger.error(f"Background hash failed for {obj_id}: {e}")
+
+    def _queue_content_update(self, obj_id, name, file_hash, fingerprint, gen):
+        # Generation check and enqueue under one lock: a stale result can't land after a newer one
+        with self._content_lock:
+            if self._content_gens.get(obj_id) != gen:
+                logger.debug(f"Dropping stale content hash for {obj_id} (generation {gen})")
+                return
+
+            # 2. Check Shadow (synced files) & Pending Actions (offline/syncing files) in one query
+            # If the content is already synced or queued with the same hash, skip.
+            if self.db.is_content_known(obj_id, file_hash):
+                return
+
+            # 3. Queue Action. The (size, mtime_ns) the hash was taken at goes along, so the engine's
+            # shadow fingerprint can't vouch for edits made after hashing.
+            local_size, local_mtime_ns = fingerprint or (None, None)
+            self.db.enqueue_action(
+                obj_id, 'update_content', 'push', 
+                metadata={'file_hash': file_hash, 'name': name,
+                          'local_size': local_size, 'local_mtime_ns': local_mtime_ns}
+            )
+
     def rename(self, old_path, new_path):
         old_parent, old_name = os.path.split(old_path)
         new_parent, new_name = os.path.split(new_path)
         obj = self._resolve(old_path)
-        dest_parent = self._resolve(new_parent)
-        
-        if not obj or not dest_parent: raise FuseOSError(errno.ENOENT)
+        if not obj: raise FuseOSError(errno.ENOENT)
+
+        # Plain rename within a folder: the destination is the current parent, no second walk
+        if new_parent == old_parent:
+            dest_parent_id = obj.local.parent_id
+        else:
+            dest_parent = self._resolve(new_parent)
+            if not dest_parent: raise FuseOSError(errno.ENOENT)
+            dest_parent_id = dest_parent.id
 
         original_parent_id = obj.local.parent_id
-        is_move = (obj.local.parent_id != dest_parent.id)
+        is_move = (obj.local.parent_id != dest_parent_id)
         is_rename = (old_name != new_name)
 
         # Update Local DB immediately for UI responsiveness
@@ -400,44 +755,62 @@ class OrchardFS(Operations):
             obj.local.name = new_name
             obj.local.extension = None
             
-        obj.local.parent_id = dest_parent.id
-        obj.commit()
-
-        # Enqueue with Metadata for intent safety
-        if is_move:
-            self.db.enqueue_action(
-                obj.id, 'move', 'push', 
-                destination=dest_parent.id, 
-                metadata={'original_parent_id': original_parent_id}
-            )
-        if is_rename:
-            self.db.enqueue_action(
-                obj.id, 'rename', 'push', 
-                destination=new_name, 
-                metadata={'from_name': old_name, 'to_name': new_name}
-            )
+        obj.local.parent_id = dest_parent_id
+        with self.db.batch(): # Local update + move/rename actions in one commit
+            obj.commit()
+
+            # Enqueue with Metadata for intent safety
+            if is_move:
+                self.db.enqueue_action(
+                    obj.id, 'move', 'push', 
+                    destination=dest_parent_id, 
+                    metadata={'original_parent_id': original_parent_id}
+                )
+            if is_rename:
+                self.db.enqueue_action(
+                    obj.id, 'rename', 'push', 
+                    destination=new_name, 
+                    metadata={'from_name': old_name, 'to_name': new_name}
+                )
             
-        if old_path in self.path_to_id: del self.path_to_id[old_path]
+        self.db.notify_children(original_parent_id, dest_parent_id)
+
+        # Re-key the cached subtree under the new path in one pass
+        self.path_to_id.rekey_prefix(old_path, new_path)
+        self._neg_cache.clear()
+        self._attr_cache.clear() # Every path under old_path moved
+        self.path_to_id[new_path] = obj.id
 
     def unlink(self, path):
         obj = self._resolve(path)
         if not obj: raise FuseOSError(errno.ENOENT)
         
-        self.db.execute("UPDATE objects SET deleted=1 WHERE id=?", (obj.id,))
-        self.db.enqueue_action(obj.id, 'delete', 'push')
+        with self.db.batch():
+            self.db.execute("UPDATE objects SET deleted=1 WHERE id=?", (obj.id,))
+            self.db.enqueue_action(obj.id, 'delete', 'push')
+        self.db.notify_children(obj.local.parent_id)
         
         if isinstance(obj, DriveFile):
             p = obj.get_local_full_path()
             if os.path.exists(p): os.remove(p)
-        if path in self.path_to_id: del self.path_to_id[path]
+            with self._hash_lock: self._hashers.pop(obj.id, None)
+            with self._pending_lock:
+                self._pending_writes.pop(obj.id, None)
+                self._truncations.pop(obj.id, None)
+            with self._content_lock: self._content_gens.pop(obj.id, None) # Drops any rehash still queued
+        self.path_to_id.pop(path)
+        self._attr_cache.pop(path, None)
 
     def mkdir(self, path, mode):
         parent_path, name = os.path.split(path)
+        self._neg_cache.pop(path, None)
         parent = self._resolve(parent_path)
         if not parent: raise FuseOSError(errno.ENOENT)
         
-        new_obj = DriveFolder.create_new_folder(self.db, parent.id, name)
-        self.db.enqueue_action(new_obj.id, 'upload', 'push', metadata={'name': name})
+        with self.db.batch():
+            new_obj = DriveFolder.create_new_folder(self.db, parent.id, name)
+            self.db.enqueue_action(new_obj.id, 'upload', 'push', metadata={'name': name})
+        self.db.notify_children(parent.id)
 
     def rmdir(self, path):
         # reuse unlink logic mostly, but check empty
@@ -1,7 +1,8 @@
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, GdkPixbuf
-from pathlib import Path
+from gi.repository import Gtk
+
+from .assets import load_logo
 
 class OrchardAboutDialog(Gtk.AboutDialog):
     def __init__(self, parent):
@@ -16,11 +17,12 @@ class OrchardAboutDialog(Gtk.AboutDialog):
         self.set_authors(["Rati Vardiashvili"])
         self.set_artists(["Rati Vardiashvili"])
         
-        # Set custom logo
+        # Custom logo is rasterized on first realize and shared by later dialogs
+        self.connect("realize", self._load_logo)
+
+    def _load_logo(self, _):
         try:
-            icon_path = Path(__file__).parent.parent.parent / "src/assets/icons/orchard-logo.svg"
-            if icon_path.exists():
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(str(icon_path), 128, 128, True)
-                self.set_logo(pixbuf)
+            pixbuf = load_logo()
+            if pixbuf: self.set_logo(pixbuf)
         except Exception as e:
             print(f"Error loading about dialog logo: {e}")
@@ -0,0 +1,20 @@
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import GdkPixbuf
+from pathlib import Path
+
+# Resolved once at import; used for assets and for the autostart entry's Exec line
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+MAIN_SCRIPT = REPO_ROOT / "src/main.py"
+ICONS_DIR = REPO_ROOT / "src/assets/icons"
+LOGO_PATH = ICONS_DIR / "orchard-logo.svg"
+UI_DIR = REPO_ROOT / "src/assets/ui" # GtkBuilder layouts for the static parts of the UI
+
+_pixbufs = {} # (path, size) -> decoded pixbuf, shared by the window, wizard and about dialog
+
+def load_logo(size=128):
+    """The Orchard logo scaled to size px, rasterized once per process. None if the asset is missing."""
+    key = (str(LOGO_PATH), size)
+    if key not in _pixbufs:
+        _pixbufs[key] = GdkPixbuf.Pixbuf.new_from_file_at_scale(str(LOGO_PATH), size, size, True) if LOGO_PATH.exists() else None
+    return _pixbufs[key]
@@ -0,0 +1,53 @@
+import concurrent.futures
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from .assets import MAIN_SCRIPT
+
+AUTOSTART_FILE = Path.home() / ".config/autostart/orchard.desktop"
+
+DESKTOP_ENTRY = f"""[Desktop Entry]
+Name=Orchard
+Comment=iCloud Drive for Linux
+Exec={sys.executable} {MAIN_SCRIPT}
+Icon=orchard-logo
+Terminal=false
+Type=Application
+Categories=Network;FileTransfer;
+X-GNOME-Autostart-enabled=true
+"""
+
+# One worker, so toggles hit the disk in the order they were made (on-then-off can't end up on).
+# Not a daemon: a pending toggle still lands if the app quits right after it.
+_WORKER = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="orchard-autostart")
+
+def _write_entry():
+    """Write the entry to a temp file, fsync it, then rename it into place so a crash never leaves a partial file."""
+    AUTOSTART_FILE.parent.mkdir(parents=True, exist_ok=True)
+    # Own temp name per write, in the same directory so the rename stays atomic
+    fd, tmp = tempfile.mkstemp(prefix='.orchard-', suffix='.tmp', dir=AUTOSTART_FILE.parent)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(DESKTOP_ENTRY)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o755)
+        os.replace(tmp, AUTOSTART_FILE)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def _apply(enabled):
+    try:
+        if enabled:
+            _write_entry()
+        else:
+            AUTOSTART_FILE.unlink(missing_ok=True)
+    except Exception as e:
+        print(f"Failed to {'enable' if enabled else 'disable'} autostart: {e}")
+
+def set_autostart(enabled):
+    """Enable or disable launching Orchard on login. The disk work runs on the autostart worker, off the Gtk main loop."""
+    return _WORKER.submit(_apply, enabled)
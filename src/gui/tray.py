@@ -4,37 +4,48 @@ import time
 import webbrowser
 import os
 import signal
-from pathlib import Path
 
 try:
     gi.require_version('Gtk', '3.0')
     gi.require_version('AppIndicator3', '0.1')
     from gi.repository import Gtk, AppIndicator3, GLib
     from .window import OrchardWindow
+    from .assets import ICONS_DIR
 except ValueError:
     print("CRITICAL: Gtk3 or AppIndicator3 not found. Tray icon will not work.")
     print("Install: sudo apt install gir1.2-appindicator3-0.1 (Ubuntu) or libappindicator-gtk3 (Fedora)")
     # We might want to fallback to CLI-only mode here, but let's assume dependencies for now.
 
+# Fixed SQL text for the 1s poll, so it always hits the connection's statement cache
+Q_STATUS_COUNTS = "SELECT status, n FROM actions_counters WHERE status IN ('pending', 'processing', 'failed')"
+
 class OrchardTray:
     def __init__(self, engine, mount_point):
         self.engine = engine
         self.mount_point = mount_point
         self.app_id = "orchard-sync"
         self.window = None
+        self._polling = False # A status query is in flight on the worker thread
         
         # Set App Name for Tooltip/Menu
         GLib.set_prgname("Orchard")
         GLib.set_application_name("Orchard")
         
         # Resolve icon path
-        base_path = Path(__file__).parent.parent.parent.resolve()
-        self.icon_base = base_path / "src/assets/icons"
+        self.icon_base = ICONS_DIR
         self.icon_path = str(self.icon_base / "orchard-logo.svg")
         
         if not os.path.exists(self.icon_path):
             self.icon_path = "orchard-logo" # Fallback to installed name
 
+        # Resolve each status icon once; fall back to the installed icon name
+        self._icon_paths = {}
+        for name in ("orchard-logo", "orchard-logo-offline", "orchard-logo-sync", "orchard-logo-error"):
+            path = self.icon_base / f"{name}.svg"
+            self._icon_paths[name] = str(path) if path.exists() else name
+        self._last_icon = "orchard-logo"
+        self._last_label = None
+
         self.indicator = AppIndicator3.Indicator.new(
             self.app_id,
             self.icon_path,
@@ -85,48 +96,67 @@ class OrchardTray:
         self.menu.show_all()
 
     def _update_status(self):
-        # Poll DB or Engine for status
-        
+        # Poll DB or Engine for status. The DB query runs off the GTK main loop.
+        if not self.engine.drive_svc:
+            self._apply_status(None, 0, 0)
+        elif not self._polling:
+            self._polling = True
+            threading.Thread(target=self._poll_counts, daemon=True).start()
+        return True # Keep polling
+
+    def _poll_counts(self):
+        count = fail_count = 0
+        error = None
+        try:
+            # Trigger-maintained per-status counts: reads at most three rows
+            rows = self.engine.db.fetchall(Q_STATUS_COUNTS)
+            for row in rows:
+                if row['status'] == 'failed': fail_count = row['n']
+                else: count += row['n']
+        except Exception as e:
+            error = e
+        GLib.idle_add(self._on_poll_done, error, count, fail_count)
+
+    def _on_poll_done(self, error, count, fail_count):
+        # Only the worker's own callback ends the poll; the offline path never touches _polling
+        self._polling = False
+        return self._apply_status(error, count, fail_count)
+
+    def _apply_status(self, error, count, fail_count):
         icon_name = "orchard-logo"
         
         try:
+            if error:
+                raise error
             # Check Offline
             if not self.engine.drive_svc:
-                self.status_item.set_label("Status: Offline (Connecting...)")
+                label = "Status: Offline (Connecting...)"
                 icon_name = "orchard-logo-offline"
+            elif fail_count > 0:
+                label = f"Status: {fail_count} Errors"
+                icon_name = "orchard-logo-error"
+            elif count > 0:
+                label = f"Status: Syncing ({count} items)..."
+                icon_name = "orchard-logo-sync"
             else:
-                pending = self.engine.db.fetchone("SELECT COUNT(*) as c FROM actions WHERE status IN ('pending', 'processing')")
-                count = pending['c'] if pending else 0
-                
-                failed = self.engine.db.fetchone("SELECT COUNT(*) as c FROM actions WHERE status='failed'")
-                fail_count = failed['c'] if failed else 0
-                
-                if fail_count > 0:
-                    self.status_item.set_label(f"Status: {fail_count} Errors")
-                    icon_name = "orchard-logo-error"
-                elif count > 0:
-                    self.status_item.set_label(f"Status: Syncing ({count} items)...")
-                    icon_name = "orchard-logo-sync"
-                else:
-                    self.status_item.set_label("Status: Idle (Synced)")
-                    icon_name = "orchard-logo"
+                label = "Status: Idle (Synced)"
+                icon_name = "orchard-logo"
             
-            # Resolve to path if possible
-            if self.icon_base:
-                path = self.icon_base / f"{icon_name}.svg"
-                if path.exists():
-                    self.indicator.set_icon(str(path))
-                else:
-                    self.indicator.set_icon(icon_name)
-            else:
-                self.indicator.set_icon(icon_name)
+            # Only touch the widgets on transitions (set_icon costs a DBus round-trip)
+            if label != self._last_label:
+                self.status_item.set_label(label)
+                self._last_label = label
+            if icon_name != self._last_icon:
+                self.indicator.set_icon(self._icon_paths[icon_name])
+                self._last_icon = icon_name
                 
         except Exception as e:
             self.status_item.set_label("Status: Database Error")
+            self._last_label = None
             # self.indicator.set_icon("orchard-logo-error") # Skip to avoid loop
             print(f"Tray Update Error: {e}")
 
-        return True # Keep polling
+        return False # One-shot idle callback
 
     def _open_drive(self, _):
         try:
@@ -1,11 +1,46 @@
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, GLib, GdkPixbuf
-import os
-import sys
-from pathlib import Path
+from gi.repository import Gtk, Gdk, GLib, Gio, GObject
+import concurrent.futures
+
+from .assets import load_logo, UI_DIR
+from .autostart import AUTOSTART_FILE, set_autostart
+
+STATUS_PAGE = 0 # Notebook index of the Status tab
+REFRESH_INTERVAL = 5 # seconds between status refreshes while the Status tab is visible
+
+# Fixed SQL text for the UI's repeated queries, so they always hit the connection's statement cache
+Q_CONFLICTS = "SELECT id, name FROM objects WHERE sync_state='conflict' ORDER BY name"
+
+class ConflictItem(GObject.Object):
+    """Row model for the Conflicts tab."""
+    def __init__(self, name, obj_id):
+        super().__init__()
+        self.name = name
+        self.obj_id = obj_id
+
+@Gtk.Template.from_file(str(UI_DIR / "conflict_row.ui"))
+class ConflictRow(Gtk.ListBoxRow):
+    """A Conflicts tab row, instantiated from a template with its children pre-declared."""
+    __gtype_name__ = "OrchardConflictRow"
+
+    lbl_name = Gtk.Template.Child()
+    btn_local = Gtk.Template.Child()
+    btn_cloud = Gtk.Template.Child()
+
+    def __init__(self, item, on_keep_local, on_keep_cloud):
+        super().__init__()
+        self.lbl_name.set_label(item.name)
+        self.btn_local.connect("clicked", on_keep_local, item.obj_id)
+        self.btn_cloud.connect("clicked", on_keep_cloud, item.obj_id)
 
 class OrchardWindow(Gtk.Window):
+    STATE_MARKUP = {
+        'offline': "<span foreground='gray'>Offline</span>",
+        'syncing': "<span foreground='#2196F3'>Syncing...</span>",
+        'idle': "<span foreground='#4CAF50'>Everything is up to date</span>",
+    }
+
     def __init__(self, engine, mount_point):
         super().__init__(title="Orchard Control Panel")
         self.engine = engine
@@ -29,28 +64,39 @@ class OrchardWindow(Gtk.Window):
         
         # Window Icon
         try:
-            self.assets_path = Path(__file__).parent.parent.parent / "src/assets/icons"
-            icon_path = self.assets_path / "orchard-logo.svg"
-            if icon_path.exists():
-                self.set_icon_from_file(str(icon_path))
+            logo = load_logo()
+            if logo: self.set_icon(logo)
         except: pass
         
         # Main Layout
         self.notebook = Gtk.Notebook()
         self.add(self.notebook)
         
-        # Tabs
+        # Tabs; only Status is built up front, the others on first visit (see _on_switch_page)
+        self._tab_init = {} # page_num -> (box, init_func) for tabs not built yet
         self._add_tab("Status", "network-idle", self._init_status_tab)
-        self._add_tab("Conflicts", "dialog-warning", self._init_conflict_tab)
-        self._add_tab("Settings", "preferences-system", self._init_settings_tab)
+        self._add_tab("Conflicts", "dialog-warning", self._init_conflict_tab, lazy=True)
+        self._add_tab("Settings", "preferences-system", self._init_settings_tab, lazy=True)
+        
+        # DB reads run here and report back via GLib.idle_add, keeping SQLite off the GTK loop
+        self._db_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._refresh_future = None
+        self._closed = False
+        self.connect("destroy", self._on_destroy)
         
-        # Timer for refreshing UI
-        GLib.timeout_add_seconds(2, self._refresh_ui)
+        # Timer for refreshing UI; paused while the window is minimized
+        self._last_pending = None # Values last rendered on the Status tab
+        self._last_state = None
+        self._refresh_source = self._start_refresh_timer()
+        self.connect("window-state-event", self._on_window_state)
+        self.notebook.connect("switch-page", self._on_switch_page)
+        self.connect("map", lambda _: self._request_refresh()) # First refresh as soon as it's shown
 
-    def _add_tab(self, label, icon_name, init_func):
+    def _add_tab(self, label, icon_name, init_func, lazy=False):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=15)
         box.set_border_width(20)
-        init_func(box)
+        if not lazy:
+            init_func(box)
         
         # Tab Label with Icon
         tab_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=5)
@@ -63,7 +109,9 @@ class OrchardWindow(Gtk.Window):
         tab_box.pack_start(lbl, False, False, 0)
         tab_box.show_all()
         
-        self.notebook.append_page(box, tab_box)
+        page_num = self.notebook.append_page(box, tab_box)
+        if lazy:
+            self._tab_init[page_num] = (box, init_func)
 
     def _init_status_tab(self, box):
         # Center Box for Logo & Status
@@ -75,9 +123,8 @@ class OrchardWindow(Gtk.Window):
 
         # 1. Logo
         try:
-            logo_path = self.assets_path / "orchard-logo.svg"
-            if logo_path.exists():
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(str(logo_path), 128, 128, True)
+            pixbuf = load_logo()
+            if pixbuf:
                 img_logo = Gtk.Image.new_from_pixbuf(pixbuf)
                 center_box.pack_start(img_logo, False, False, 10)
         except Exception as e:
@@ -131,6 +178,12 @@ class OrchardWindow(Gtk.Window):
         
         self.conflict_list = Gtk.ListBox()
         self.conflict_list.set_selection_mode(Gtk.SelectionMode.NONE)
+        # Rows are built by the list from the store, so a refresh is one splice
+        self.conflict_store = Gio.ListStore.new(ConflictItem)
+        self.conflict_list.bind_model(self.conflict_store, self._build_conflict_row)
+        placeholder = Gtk.Label(label="No conflicts found.")
+        placeholder.show()
+        self.conflict_list.set_placeholder(placeholder)
         scrolled.add(self.conflict_list)
         
         # Refresh button
@@ -138,147 +191,169 @@ class OrchardWindow(Gtk.Window):
         btn_refresh.connect("clicked", self._load_conflicts)
         box.pack_start(btn_refresh, False, False, 0)
 
+        self._load_conflicts() # Built on first visit, so fill it straight away
+
     def _init_settings_tab(self, box):
-        grid = Gtk.Grid()
-        grid.set_column_spacing(10)
-        grid.set_row_spacing(20)
-        grid.set_border_width(20)
-        box.pack_start(grid, False, False, 0)
-        
-        # Autostart
-        self.autostart_file = Path.home() / ".config/autostart/orchard.desktop"
-        
-        lbl_auto = Gtk.Label(label="<b>Startup</b>", use_markup=True, xalign=0)
-        grid.attach(lbl_auto, 0, 0, 2, 1)
-        
-        self.check_autostart = Gtk.CheckButton(label="Start Orchard automatically on login")
-        self.check_autostart.set_active(self.autostart_file.exists())
-        self.check_autostart.connect("toggled", self._toggle_autostart)
-        grid.attach(self.check_autostart, 0, 1, 2, 1)
-        
-        # Separator
-        grid.attach(Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL), 0, 2, 2, 1)
-        
-        # Re-run Wizard
-        lbl_wiz = Gtk.Label(label="<b>Account Management</b>", use_markup=True, xalign=0)
-        grid.attach(lbl_wiz, 0, 3, 2, 1)
-        
-        lbl_wiz_desc = Gtk.Label(label="Need to change account or mount point?", xalign=0)
-        grid.attach(lbl_wiz_desc, 0, 4, 1, 1)
-        
-        btn_wizard = Gtk.Button(label="Re-run Setup Wizard")
-        btn_wizard.connect("clicked", self._open_wizard)
-        grid.attach(btn_wizard, 1, 4, 1, 1)
+        # Static layout: parsed in one pass by GtkBuilder instead of built widget by widget
+        builder = Gtk.Builder.new_from_file(str(UI_DIR / "settings.ui"))
+        self.check_autostart = builder.get_object("check_autostart")
+        self.check_autostart.set_active(AUTOSTART_FILE.exists())
+        builder.connect_signals(self) # After set_active, so the initial state doesn't rewrite the file
+        box.pack_start(builder.get_object("settings_grid"), False, False, 0)
+
+    def _run_in_background(self, query, apply):
+        """Runs query() on the DB worker and apply(result) on the GTK main loop."""
+        def done(fut):
+            try: result = fut.result()
+            except Exception as e:
+                print(f"UI query error: {e}")
+                return
+            GLib.idle_add(lambda: not self._closed and apply(result) and False)
+        fut = self._db_pool.submit(query)
+        fut.add_done_callback(done)
+        return fut
+
+    def _on_destroy(self, _):
+        self._closed = True
+        self._db_pool.shutdown(wait=False)
+
+    def _on_window_state(self, _, event):
+        iconified = bool(event.new_window_state & Gdk.WindowState.ICONIFIED)
+        if iconified and self._refresh_source:
+            GLib.source_remove(self._refresh_source)
+            self._refresh_source = None
+        elif not iconified and not self._refresh_source and not self._closed:
+            self._refresh_source = self._start_refresh_timer()
+            self._request_refresh()
+        return False
+
+    def _on_switch_page(self, _, __, page_num):
+        pending = self._tab_init.pop(page_num, None)
+        if pending:
+            box, init_func = pending
+            init_func(box)
+            box.show_all()
+        # Don't make the user wait a full interval after coming back to the Status tab
+        if page_num == STATUS_PAGE: self._request_refresh()
+
+    def _start_refresh_timer(self):
+        # Low priority: a slow tick must never delay drawing or input
+        return GLib.timeout_add_seconds(REFRESH_INTERVAL, self._refresh_ui, priority=GLib.PRIORITY_LOW)
+
+    def _request_refresh(self):
+        """Schedules a single out-of-band refresh (after a resolve, tab switch, restore...)."""
+        GLib.idle_add(self._refresh_ui_once, priority=GLib.PRIORITY_DEFAULT_IDLE)
+
+    def _refresh_ui_once(self):
+        self._refresh_ui()
+        return False # Single shot
 
     def _refresh_ui(self):
-        # Update Status
-        pending = self.engine.db.fetchone("SELECT COUNT(*) as c FROM actions WHERE status IN ('pending', 'processing')")
-        count = pending['c'] if pending else 0
-        self.lbl_pending.set_label(str(count))
-
-        if not self.engine.drive_svc:
-            self.lbl_state.set_markup("<span foreground='gray'>Offline</span>")
-        elif count > 0:
-            self.lbl_state.set_markup("<span foreground='#2196F3'>Syncing...</span>")
-        else:
-            self.lbl_state.set_markup("<span foreground='#4CAF50'>Everything is up to date</span>")
-            
+        if self._closed:
+            self._refresh_source = None
+            return False # Stop the timer with the window
+        # Nothing to update unless the Status tab is on screen
+        if not self.get_visible() or self.notebook.get_current_page() != STATUS_PAGE: return True
+        # Skip the tick if the previous count is still running
+        if not self._refresh_future or self._refresh_future.done():
+            self._refresh_future = self._run_in_background(self._query_pending, self._apply_pending)
         return True
 
+    def _query_pending(self):
+        return self.engine.db.count_actions('pending', 'processing')
+
+    def _apply_pending(self, count):
+        # Only touch a label when its own value changed (set_markup re-parses and relayouts)
+        if count != self._last_pending:
+            self._last_pending = count
+            self.lbl_pending.set_label(str(count))
+
+        if not self.engine.drive_svc: state = 'offline'
+        elif count > 0: state = 'syncing'
+        else: state = 'idle'
+        if state != self._last_state:
+            self._last_state = state
+            self.lbl_state.set_markup(self.STATE_MARKUP[state])
+
     # --- Actions ---
 
     def _toggle_autostart(self, btn):
-        if btn.get_active():
-            try:
-                self.autostart_file.parent.mkdir(parents=True, exist_ok=True)
-                repo_root = Path(__file__).parent.parent.parent.resolve()
-                main_script = repo_root / "src/main.py"
-                icon_path = repo_root / "src/assets/icons/orchard-logo.svg" # Absolute path for .desktop
-                
-                content = f"""[Desktop Entry]
-Name=Orchard
-Comment=iCloud Drive for Linux
-Exec={sys.executable} {main_script}
-Icon=orchard-logo
-Terminal=false
-Type=Application
-Categories=Network;FileTransfer;
-X-GNOME-Autostart-enabled=true
-"""
-                with open(self.autostart_file, 'w') as f:
-                    f.write(content)
-                os.chmod(self.autostart_file, 0o755)
-            except Exception as e:
-                print(f"Failed to enable autostart: {e}")
-        else:
-            if self.autostart_file.exists():
-                try: self.autostart_file.unlink()
-                except: pass
+        set_autostart(btn.get_active())
 
     def _open_wizard(self, _):
-        from src.gui.wizard import run_wizard
-        dialog = Gtk.MessageDialog(self, 0, Gtk.MessageType.WARNING, Gtk.ButtonsType.OK_CANCEL, "Restart Required")
+        # Dialogs answer through "response" so the main loop (and the engine's timers) keep running
+        dialog = Gtk.MessageDialog(self, Gtk.DialogFlags.MODAL, Gtk.MessageType.WARNING, Gtk.ButtonsType.OK_CANCEL, "Restart Required")
         dialog.format_secondary_text("Running the setup wizard will require restarting Orchard to apply changes.")
-        response = dialog.run()
+        dialog.connect("response", self._on_wizard_confirm)
+        dialog.show_all()
+
+    def _on_wizard_confirm(self, dialog, response):
         dialog.destroy()
+        if response != Gtk.ResponseType.OK:
+            return
+        from src.gui.wizard import run_wizard
+        self.hide()
+        try:
+            run_wizard()
+        except Exception as e:
+            print(f"Wizard error: {e}")
+            self.show_all()
+            return
         
-        if response == Gtk.ResponseType.OK:
-            self.hide()
-            try:
-                run_wizard()
-                
-                info = Gtk.MessageDialog(None, 0, Gtk.MessageType.INFO, Gtk.ButtonsType.OK, "Setup Complete")
-                info.format_secondary_text("Please restart Orchard to apply changes.")
-                info.run()
-                info.destroy()
-                
-                Gtk.main_quit()
-            except Exception as e:
-                print(f"Wizard error: {e}")
-                self.show_all()
+        info = Gtk.MessageDialog(None, Gtk.DialogFlags.MODAL, Gtk.MessageType.INFO, Gtk.ButtonsType.OK, "Setup Complete")
+        info.format_secondary_text("Please restart Orchard to apply changes.")
+        info.connect("response", lambda d, r: (d.destroy(), Gtk.main_quit()))
+        info.show_all()
 
     def _load_conflicts(self, _=None):
-        for child in self.conflict_list.get_children():
-            self.conflict_list.remove(child)
-            
-        rows = self.engine.db.fetchall("SELECT * FROM objects WHERE sync_state='conflict'")
-        
+        self._run_in_background(self._query_conflicts, self._apply_conflicts)
+
+    def _query_conflicts(self):
+        rows = self.engine.db.fetchall(Q_CONFLICTS)
+        return [(row['name'], row['id']) for row in rows]
+
+    def _apply_conflicts(self, rows):
+        store = self.conflict_store
+        current = [(store.get_item(i).name, store.get_item(i).obj_id) for i in range(store.get_n_items())]
+        if current == rows:
+            return # Unchanged: keep the existing rows instead of destroying and rebuilding them
         if not rows:
-            lbl = Gtk.Label(label="No conflicts found.")
-            self.conflict_list.add(lbl)
-        
-        for row in rows:
-            row_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
-            lbl_name = Gtk.Label(label=row['name'])
-            row_box.pack_start(lbl_name, True, True, 0)
-            
-            btn_local = Gtk.Button(label="Keep Local")
-            btn_local.get_style_context().add_class("suggested-action")
-            btn_local.connect("clicked", self._resolve_keep_local, row['id'])
-            row_box.pack_start(btn_local, False, False, 0)
-            
-            btn_cloud = Gtk.Button(label="Keep Cloud")
-            btn_cloud.get_style_context().add_class("destructive-action")
-            btn_cloud.connect("clicked", self._resolve_keep_cloud, row['id'])
-            row_box.pack_start(btn_cloud, False, False, 0)
-            
-            self.conflict_list.add(row_box)
-        
-        self.conflict_list.show_all()
+            store.remove_all() # Drops every row in one pass
+            return
+        # GObjects are created here, on the main thread
+        items = [ConflictItem(name, obj_id) for name, obj_id in rows]
+        store.splice(0, store.get_n_items(), items)
+
+    def _build_conflict_row(self, item):
+        return ConflictRow(item, self._resolve_keep_local, self._resolve_keep_cloud)
 
     def _resolve_keep_local(self, btn, obj_id):
-        self.engine.db.execute("UPDATE objects SET sync_state='pending_push', dirty=1 WHERE id=?", (obj_id,))
-        self.engine.db.enqueue_action(obj_id, 'update_content', 'push', priority=20)
-        self._load_conflicts()
+        def write():
+            with self.engine.db.batch(): # One commit for the state change and its action
+                self.engine.db.execute("UPDATE objects SET sync_state='pending_push', dirty=1 WHERE id=?", (obj_id,))
+                self.engine.db.enqueue_action(obj_id, 'update_content', 'push', priority=20)
+            return obj_id
+        self._run_in_background(write, self._remove_conflict)
 
     def _resolve_keep_cloud(self, btn, obj_id):
-        self.engine.db.execute("UPDATE objects SET sync_state='pending_pull', dirty=0 WHERE id=?", (obj_id,))
-        self.engine.db.execute("UPDATE drive_cache SET present_locally=0 WHERE object_id=?", (obj_id,))
-        self.engine.db.enqueue_action(obj_id, 'ensure_latest', 'pull', priority=20)
-        self._load_conflicts()
+        def write():
+            with self.engine.db.batch():
+                self.engine.db.execute("UPDATE objects SET sync_state='pending_pull', dirty=0 WHERE id=?", (obj_id,))
+                self.engine.db.execute("UPDATE drive_cache SET present_locally=0 WHERE object_id=?", (obj_id,))
+                self.engine.db.enqueue_action(obj_id, 'ensure_latest', 'pull', priority=20)
+            return obj_id
+        self._run_in_background(write, self._remove_conflict)
+
+    def _remove_conflict(self, obj_id):
+        # Drop just the resolved row instead of re-querying the whole list
+        for pos in range(self.conflict_store.get_n_items()):
+            if self.conflict_store.get_item(pos).obj_id == obj_id:
+                self.conflict_store.remove(pos)
+                break
+        self._request_refresh() # The resolve queued an action: pending count changed
 
     def _on_about_dialog(self, _):
         from .about import OrchardAboutDialog
         about_dialog = OrchardAboutDialog(self)
-        about_dialog.run()
-        about_dialog.destroy()
\ No newline at end of file
+        about_dialog.connect("response", lambda d, r: d.destroy())
+        about_dialog.show_all()
\ No newline at end of file
@@ -1,12 +1,13 @@
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, Gdk, GLib, GdkPixbuf
+from gi.repository import Gtk, Gdk, GLib
 import threading
+import queue
 import sys
-import os
-from pathlib import Path
 
 from src.config.manager import ConfigManager
+from src.gui.assets import load_logo
+from src.gui.autostart import set_autostart
 from src.icloud_client.client import OrchardiCloudClient
 
 class OrchardWizard(Gtk.Assistant):
@@ -18,6 +19,14 @@ class OrchardWizard(Gtk.Assistant):
         
         self.config = ConfigManager()
         self.client = None
+
+        # One auth worker for the wizard's lifetime, started on first use; _cancelled releases it from
+        # any pending prompt. A daemon thread, so Cancel can exit without waiting on pyicloud's network call.
+        self._auth_requests = queue.Queue()
+        self._auth_worker = None
+        self._auth_running = threading.Event() # Set from submission until the attempt finishes
+        self._cancelled = threading.Event()
+        self._prompt_dialogs = {} # prompt_type -> (dialog, entry), see _prompt_dialog
         
         self.connect("cancel", self._on_cancel)
         self.connect("close", self._on_cancel)
@@ -26,9 +35,8 @@ class OrchardWizard(Gtk.Assistant):
 
         # Window Icon
         try:
-            icon_path = Path(__file__).parent.parent.parent / "src/assets/icons/orchard-logo.svg"
-            if icon_path.exists():
-                self.set_icon_from_file(str(icon_path))
+            logo = load_logo()
+            if logo: self.set_icon(logo)
         except: pass
 
         self._init_pages()
@@ -41,12 +49,8 @@ class OrchardWizard(Gtk.Assistant):
         
         # Logo (Scaled)
         try:
-            # Resolve absolute path to assets
-            base_path = Path(__file__).parent.parent.parent
-            logo_path = base_path / "src/assets/icons/orchard-logo.svg"
-            
-            if logo_path.exists():
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(str(logo_path), 128, 128, True)
+            pixbuf = load_logo()
+            if pixbuf:
                 img = Gtk.Image.new_from_pixbuf(pixbuf)
                 self.page_welcome.pack_start(img, True, True, 0)
         except Exception as e:
@@ -56,15 +60,9 @@ class OrchardWizard(Gtk.Assistant):
         lbl.set_markup("<span size='xx-large' weight='bold'>Welcome to Orchard</span>")
         self.page_welcome.pack_start(lbl, True, True, 0)
         
-        lbl = Gtk.Label()
-        lbl.set_markup("<span size='xx-large' weight='bold'>Welcome to Orchard</span>")
-        self.page_welcome.pack_start(lbl, True, True, 0)
-        
         desc = Gtk.Label(label="iCloud for Linux.\nSync your files seamlessly.")
         desc.set_justify(Gtk.Justification.CENTER)
         self.page_welcome.pack_start(desc, True, True, 0)
-        desc.set_justify(Gtk.Justification.CENTER)
-        self.page_welcome.pack_start(desc, True, True, 0)
         
         self.append_page(self.page_welcome)
         self.set_page_title(self.page_welcome, "Welcome")
@@ -155,14 +153,21 @@ class OrchardWizard(Gtk.Assistant):
         self.lbl_auth_status.set_label(f"Authenticating as {apple_id}...")
         self.spinner.start()
         
-        # Run auth in background thread so GUI doesn't freeze
-        # But prompts must run on main thread via GLib.idle_add? 
-        # No, input_callback runs in the client thread. It must invoke GUI on Main Thread.
-        
-        import threading
-        t = threading.Thread(target=self._auth_thread)
-        t.daemon = True
-        t.start()
+        # Run auth in the background so the GUI doesn't freeze; prompts are marshalled to the main thread
+        if self._auth_running.is_set():
+            return
+        if self._auth_worker is None:
+            self._auth_worker = threading.Thread(target=self._auth_loop, name="orchard-auth", daemon=True)
+            self._auth_worker.start()
+        self._auth_running.set()
+        self._auth_requests.put(True)
+
+    def _auth_loop(self):
+        while self._auth_requests.get() and not self._cancelled.is_set():
+            try:
+                self._auth_thread()
+            finally:
+                self._auth_running.clear()
 
     def _auth_thread(self):
         self.client = OrchardiCloudClient(
@@ -173,60 +178,65 @@ class OrchardWizard(Gtk.Assistant):
         try:
             self.client.authenticate(input_callback=self._gui_input_callback)
             
+            if self._cancelled.is_set():
+                return
             if self.client.authenticated:
                 GLib.idle_add(self._auth_success)
             else:
                 GLib.idle_add(self._auth_failed, "Authentication failed.")
         except Exception as e:
-            GLib.idle_add(self._auth_failed, str(e))
+            if not self._cancelled.is_set():
+                GLib.idle_add(self._auth_failed, str(e))
+
+    def _prompt_dialog(self, prompt_type):
+        # Built once per prompt type and hidden between uses, so 2FA retries don't rebuild a toplevel
+        if prompt_type not in self._prompt_dialogs:
+            title = "Password Required" if prompt_type == "password" else "Verification Code"
+            dialog = Gtk.MessageDialog(self, 0, Gtk.MessageType.QUESTION, Gtk.ButtonsType.OK_CANCEL, title)
+            entry = Gtk.Entry()
+            entry.set_visibility(prompt_type != "password")
+            entry.connect("activate", lambda w: dialog.response(Gtk.ResponseType.OK))
+            dialog.get_content_area().add(entry)
+            self._prompt_dialogs[prompt_type] = (dialog, entry)
+        return self._prompt_dialogs[prompt_type]
 
     def _gui_input_callback(self, prompt_type, message, options=None):
         # This runs in background thread. Must invoke dialog on main thread and wait.
-        # We use a Condition variable or queue to wait for main thread result.
-        
+        # The Event is set once the dialog answers; polling lets a wizard cancel release us.
+        if self._cancelled.is_set():
+            return ""
+
         result_holder = {"value": None}
-        condition = threading.Condition()
+        answered = threading.Event()
         
         def show_dialog():
-            dialog = None
-            if prompt_type == "password":
-                dialog = Gtk.MessageDialog(self, 0, Gtk.MessageType.QUESTION, Gtk.ButtonsType.OK_CANCEL, "Password Required")
+            if self._cancelled.is_set():
+                answered.set()
+                return False
+            if prompt_type in ("password", "2fa_code"):
+                dialog, entry = self._prompt_dialog(prompt_type)
                 dialog.format_secondary_text(message)
-                entry = Gtk.Entry()
-                entry.set_visibility(False)
-                entry.connect("activate", lambda w: dialog.response(Gtk.ResponseType.OK))
-                dialog.get_content_area().add(entry)
+                entry.set_text("")
                 dialog.show_all()
+                entry.grab_focus()
                 
                 resp = dialog.run()
                 if resp == Gtk.ResponseType.OK:
                     result_holder["value"] = entry.get_text()
-                dialog.destroy()
-                
-            elif prompt_type == "2fa_code":
-                dialog = Gtk.MessageDialog(self, 0, Gtk.MessageType.QUESTION, Gtk.ButtonsType.OK_CANCEL, "Verification Code")
-                dialog.format_secondary_text(message)
-                entry = Gtk.Entry()
-                entry.connect("activate", lambda w: dialog.response(Gtk.ResponseType.OK))
-                dialog.get_content_area().add(entry)
-                dialog.show_all()
-                
-                resp = dialog.run()
-                if resp == Gtk.ResponseType.OK:
-                    result_holder["value"] = entry.get_text()
-                dialog.destroy()
+                dialog.hide()
                 
             elif prompt_type == "device_select":
                 # Not implemented nicely yet, defaulting to 0
                 result_holder["value"] = "0"
 
-            with condition:
-                condition.notify()
+            answered.set()
+            return False
                 
         GLib.idle_add(show_dialog)
         
-        with condition:
-            condition.wait()
+        while not answered.wait(timeout=0.5):
+            if self._cancelled.is_set():
+                return ""
             
         return result_holder["value"] or ""
 
@@ -243,41 +253,16 @@ class OrchardWizard(Gtk.Assistant):
         
     def _on_apply(self, assistant):
         # Configure Autostart
-        autostart_dir = Path.home() / ".config/autostart"
-        autostart_file = autostart_dir / "orchard.desktop"
-        
-        if self.check_autostart.get_active():
-            autostart_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Resolve paths
-            repo_root = Path(__file__).parent.parent.parent.resolve()
-            main_script = repo_root / "src/main.py"
-            icon_name = "orchard-logo"
-            
-            content = f"""[Desktop Entry]
-Name=Orchard
-Comment=iCloud Drive for Linux
-Exec={sys.executable} {main_script}
-Icon={icon_name}
-Terminal=false
-Type=Application
-Categories=Network;FileTransfer;
-X-GNOME-Autostart-enabled=true
-"""
-            try:
-                with open(autostart_file, 'w') as f:
-                    f.write(content)
-                os.chmod(autostart_file, 0o755)
-            except Exception as e:
-                print(f"Failed to enable autostart: {e}")
-        else:
-            if autostart_file.exists():
-                try: autostart_file.unlink()
-                except: pass
+        set_autostart(self.check_autostart.get_active())
 
         Gtk.main_quit()
 
     def _on_cancel(self, assistant):
+        self._cancelled.set()
+        self._auth_requests.put(False) # Lets an idle worker return; a busy one is a daemon and isn't joined
+        for dialog, _ in self._prompt_dialogs.values():
+            dialog.destroy()
+        self._prompt_dialogs.clear()
         Gtk.main_quit()
         import sys
         sys.exit(0) # Exit app if setup cancelled
@@ -1,9 +1,19 @@
 # apple_api_reverse_eng_proj/orchard_icloud_client/client.py
 import logging
+import asyncio
+import concurrent.futures
+import functools
 import getpass # For secure password input
+import sys
 import keyring # For system keyring integration
+import keyring.errors
+import threading
+import time
 from typing import Optional
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pyicloud import PyiCloudService
 from pyicloud.exceptions import (
     PyiCloud2FARequiredException,
@@ -16,16 +26,38 @@ LOGGER = logging.getLogger(__name__)
 # Service name for keyring storage
 KEYRING_SERVICE_NAME = "Orchard-iCloud"
 
+# (apple_id, cookie_directory) -> (PyiCloudService, last_used), so a second client in the same
+# process (wizard, then engine) reuses the trusted login instead of redoing the handshake
+_PYICLOUD_POOL: dict = {}
+_POOL_LOCK = threading.Lock()
+_POOL_MAX_IDLE = 1800 # seconds a pooled login may sit unused before it's dropped
+
+# Connections kept per host; sized above the sync engine's worker count so threads never queue for a socket
+DEFAULT_POOL_SIZE = 32
+
+# (service, apple_id) -> password (or None if absent), so repeated client construction skips the keychain IPC
+_KEYRING_CACHE: dict = {}
+_KEYRING_LOCK = threading.RLock()
+# Keychain writes run here, one at a time, off the authenticate() return path
+_KEYRING_WRITER = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="orchard-keyring")
+
 class OrchardiCloudClient:
     """
     Custom client for iCloud communications.
     Uses pyicloud for authentication and session management only.
     """
 
-    def __init__(self, apple_id: str, password: Optional[str] = None, cookie_directory: Optional[str] = None):
+    def __init__(self, apple_id: str, password: Optional[str] = None, cookie_directory: Optional[str] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE):
         self.apple_id = apple_id
+        # (service, username) for every keyring call and for _KEYRING_CACHE, built once
+        self._keyring_key = (KEYRING_SERVICE_NAME, sys.intern(apple_id))
         self.password = password
         self.cookie_directory = cookie_directory
+        self.pool_size = pool_size
+        self._webservice_url_cache: dict = {} # ws_key -> URL; fixed for the life of a login
+        self._webservices: Optional[dict] = None
+        self._session = None # Bound once logged in; see the session property
         self._pyicloud_service: Optional[PyiCloudService] = None
         self.authenticated = False
         self._password_provided_by_user = False # Track if password was initially passed or prompted
@@ -39,28 +71,50 @@ class OrchardiCloudClient:
             self._password_provided_by_user = True # User provided password, might need saving
 
     def _get_password_from_keyring(self) -> Optional[str]:
-        """Retrieve password from system keyring."""
-        try:
-            return keyring.get_password(KEYRING_SERVICE_NAME, self.apple_id)
-        except Exception as e:
-            LOGGER.warning(f"Could not retrieve password from keyring: {e}")
-            return None
+        """Retrieve password from system keyring (memoized per Apple ID)."""
+        with _KEYRING_LOCK:
+            if self._keyring_key in _KEYRING_CACHE:
+                return _KEYRING_CACHE[self._keyring_key]
+            try:
+                password = keyring.get_password(*self._keyring_key)
+            except keyring.errors.NoKeyringError as e:
+                LOGGER.warning("No system keyring available: %s", e)
+                _KEYRING_CACHE[self._keyring_key] = None # Won't appear mid-process, don't ask again
+                return None
+            except Exception as e: # Backends also surface raw D-Bus/OS errors, not only KeyringError
+                LOGGER.warning("Could not retrieve password from keyring: %s", e)
+                return None # Not cached: a transient backend error shouldn't stick
+            _KEYRING_CACHE[self._keyring_key] = password
+            return password
 
     def _save_password_to_keyring(self, password: str):
         """Save password to system keyring."""
-        try:
-            keyring.set_password(KEYRING_SERVICE_NAME, self.apple_id, password)
-            LOGGER.info("Password saved to system keyring.")
-        except Exception as e:
-            LOGGER.error(f"Failed to save password to keyring: {e}")
+        with _KEYRING_LOCK:
+            _KEYRING_CACHE.pop(self._keyring_key, None)
+            try:
+                keyring.set_password(*self._keyring_key, password)
+                _KEYRING_CACHE[self._keyring_key] = password
+                LOGGER.info("Password saved to system keyring.")
+            except Exception as e:
+                LOGGER.error("Failed to save password to keyring: %s", e)
 
-    def authenticate(self, input_callback=None):
+    def authenticate(self, input_callback=None, force: bool = False):
         """
         Authenticates with iCloud using pyicloud.
         Handles 2FA/2SA prompts via CLI or optional callback.
         input_callback(type, message, options=None) -> str
         types: 'password', '2fa_code', 'device_select'
+        A no-op when this client is already logged in, unless force=True.
         """
+        if not force and self.authenticated and self.session is not None:
+            return
+
+        self.authenticated = False
+        self._session = None
+        if not force and self._take_pooled_session():
+            LOGGER.info("Reusing authenticated session for %s", self.apple_id)
+            return
+
         # Prompt for password if not available from init or keyring
         if self.password is None:
             if input_callback:
@@ -74,6 +128,10 @@ class OrchardiCloudClient:
                 self.authenticated = False
                 return
 
+        # A new login may land on different service hosts
+        self._webservice_url_cache.clear()
+        self._webservices = None
+
         try:
             # Initialize PyiCloudService. 
             self._pyicloud_service = PyiCloudService(
@@ -87,26 +145,112 @@ class OrchardiCloudClient:
                 self._handle_2fa(input_callback) 
             else:
                 self.authenticated = True
-                LOGGER.info(f"Successfully authenticated as {self.apple_id}")
+                LOGGER.info("Successfully authenticated as %s", self.apple_id)
 
+            if self.authenticated:
+                self._configure_session()
+                self._session = self._pyicloud_service.session
+                self._touch_pooled_session()
             if self.authenticated and self._password_provided_by_user:
-                self._save_password_to_keyring(self.password)
+                _KEYRING_WRITER.submit(self._save_password_to_keyring, self.password)
         except PyiCloudAuthRequiredException as e:
-            LOGGER.error(f"Authentication required: {e}")
+            LOGGER.error("Authentication required: %s", e)
             self.authenticated = False
         except PyiCloudFailedLoginException:
             LOGGER.error("Failed to login to iCloud. Please check your credentials.")
+            with _POOL_LOCK:
+                _PYICLOUD_POOL.pop(self._pool_key(), None)
             if self.password and not self._password_provided_by_user: 
                  try:
-                     keyring.delete_password(KEYRING_SERVICE_NAME, self.apple_id)
+                     with _KEYRING_LOCK:
+                         _KEYRING_CACHE.pop(self._keyring_key, None)
+                         keyring.delete_password(*self._keyring_key)
                      LOGGER.info("Password removed from keyring due to failed login.")
+                 except keyring.errors.PasswordDeleteError:
+                     pass # Already gone
                  except Exception as e:
-                     LOGGER.warning(f"Failed to remove password from keyring after failed login: {e}")
+                     LOGGER.warning("Failed to remove password from keyring after failed login: %s", e)
+            self.authenticated = False
+        except (requests.RequestException, ConnectionError, TimeoutError) as e:
+            LOGGER.error("Could not reach iCloud to authenticate: %s", e)
             self.authenticated = False
         except Exception as e:
-            LOGGER.error(f"An unexpected error occurred during authentication: {e}")
+            LOGGER.error("An unexpected error occurred during authentication: %s", e)
             self.authenticated = False
 
+    async def authenticate_async(self, input_callback=None, force: bool = False) -> bool:
+        """
+        authenticate() on the loop's default executor, so several accounts can log in concurrently
+        (e.g. asyncio.gather(*(c.authenticate_async() for c in clients))).
+        input_callback is still called synchronously, from the worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self.authenticate, input_callback=input_callback, force=force))
+        return self.authenticated
+
+    def _pool_key(self):
+        return (self.apple_id, self.cookie_directory)
+
+    def _take_pooled_session(self) -> bool:
+        """Adopts a pooled login if one is fresh and fully trusted. Stale entries are evicted on the way."""
+        now = time.monotonic()
+        with _POOL_LOCK:
+            for key, (_, last_used) in list(_PYICLOUD_POOL.items()):
+                if now - last_used >= _POOL_MAX_IDLE:
+                    del _PYICLOUD_POOL[key]
+            pooled = _PYICLOUD_POOL.get(self._pool_key())
+            if not pooled:
+                return False
+            service = pooled[0]
+            if service.requires_2fa or service.requires_2sa:
+                del _PYICLOUD_POOL[self._pool_key()]
+                return False
+            _PYICLOUD_POOL[self._pool_key()] = (service, now)
+        self._webservice_url_cache.clear()
+        self._webservices = None
+        self._pyicloud_service = service
+        self._session = service.session
+        self.authenticated = True
+        return True
+
+    def _touch_pooled_session(self):
+        with _POOL_LOCK:
+            _PYICLOUD_POOL[self._pool_key()] = (self._pyicloud_service, time.monotonic())
+
+    def _trust_session(self):
+        """
+        Asks Apple to remember this machine. pyicloud stores the returned trust token with the
+        session data in cookie_directory, and requires_2fa stays False while it is valid,
+        so later starts skip _handle_2fa entirely.
+        """
+        service = self._pyicloud_service
+        if not hasattr(service, "trust_session") or getattr(service, "is_trusted_session", False):
+            return
+        try:
+            if service.trust_session():
+                LOGGER.info("Session marked as trusted; 2FA won't be asked again on this machine.")
+            else:
+                LOGGER.warning("Failed to request a trusted session; 2FA will be required next time.")
+        except Exception as e:
+            LOGGER.warning("Failed to request a trusted session: %s", e)
+
+    def _configure_session(self):
+        """
+        Mounts a pooled HTTPS adapter on the pyicloud session so concurrent API calls
+        reuse TCP+TLS connections instead of queueing on requests' default 10-slot pool.
+        Retries cover connection errors and throttling/5xx on idempotent methods only;
+        uploads and other POSTs are left to the sync engine's own retry handling.
+        """
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            raise_on_status=False,
+        )
+        # pool_block=False: a burst past the pool opens an extra connection rather than stalling
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, pool_block=False, max_retries=retry)
+        self._pyicloud_service.session.mount("https://", adapter)
+
     def _handle_2fa(self, input_callback=None):
         """
         Handles the 2FA process by prompting the user for a code.
@@ -129,11 +273,12 @@ class OrchardiCloudClient:
                 if result:
                     self.authenticated = True
                     LOGGER.info("2FA code validated successfully.")
+                    self._trust_session()
                 else:
                     LOGGER.error("Failed to validate 2FA code.")
                     self.authenticated = False
             except Exception as e:
-                LOGGER.error(f"Error during 2FA validation: {e}")
+                LOGGER.error("Error during 2FA validation: %s", e)
                 self.authenticated = False
         elif self._pyicloud_service.requires_2sa: 
             print("Two-step verification required.")
@@ -179,7 +324,7 @@ class OrchardiCloudClient:
                     LOGGER.error("Failed to send verification code.")
                     self.authenticated = False
             except Exception as e:
-                LOGGER.error(f"Error during trusted device verification: {e}")
+                LOGGER.error("Error during trusted device verification: %s", e)
                 self.authenticated = False
         else: 
             LOGGER.error("Authentication requires further interaction not handled by simple 2FA/2SA checks.")
@@ -192,6 +337,8 @@ class OrchardiCloudClient:
         Returns the underlying requests.Session object from pyicloud.
         This session is authenticated and will be used for raw API calls.
         """
+        if self._session is not None:
+            return self._session
         if self._pyicloud_service and self._pyicloud_service.session:
             return self._pyicloud_service.session
         return None
@@ -201,18 +348,23 @@ class OrchardiCloudClient:
         """
         Returns the webservices dictionary from pyicloud, which contains API URLs.
         """
-        if self._pyicloud_service:
-            return self._pyicloud_service.data.get('webservices')
-        return None
+        if self._webservices is None and self._pyicloud_service:
+            self._webservices = self._pyicloud_service.data.get('webservices')
+        return self._webservices
 
     def get_webservice_url(self, ws_key: str) -> Optional[str]:
         """
         Helper to get a webservice URL using pyicloud's method.
         """
+        if ws_key in self._webservice_url_cache:
+            return self._webservice_url_cache[ws_key]
         if self._pyicloud_service:
             try:
-                return self._pyicloud_service.get_webservice_url(ws_key)
+                url = self._pyicloud_service.get_webservice_url(ws_key)
+                if url:
+                    self._webservice_url_cache[ws_key] = url
+                return url
             except Exception as e:
-                LOGGER.error(f"Failed to get webservice URL for {ws_key}: {e}")
+                LOGGER.error("Failed to get webservice URL for %s: %s", ws_key, e)
         return None
 
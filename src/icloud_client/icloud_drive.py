@@ -1,25 +1,118 @@
 import logging
+import concurrent.futures
+import contextlib
+from collections import deque
+import functools
+import itertools
+import http.cookiejar
+import io
 import mimetypes
 import os
+import shutil
+import threading
+import time
 import uuid
 import json
 from typing import Any, Dict, List, Optional
+import requests
 from requests import Session, Response
+from requests.adapters import HTTPAdapter
 from pyicloud.exceptions import PyiCloudAPIResponseException
 
 LOGGER = logging.getLogger(__name__)
 
+# orjson is optional: several times faster on the large listing payloads, stdlib json otherwise.
+# Both raise ValueError subclasses on bad input.
+try:
+    import orjson
+
+    def _loads(data: bytes) -> Any:
+        return orjson.loads(data)
+
+    def _dumps_compact(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _loads(data: bytes) -> Any:
+        return json.loads(data)
+
+    def _dumps_compact(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+# httpx is optional too: with use_http2 the metadata/mutation calls share multiplexed HTTP/2 connections.
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 # Constants from pyicloud.services.drive
 CLOUD_DOCS_ZONE = "com.apple.CloudDocs"
 NODE_ROOT = "root"
 CLOUD_DOCS_ZONE_ID_ROOT = f"FOLDER::{CLOUD_DOCS_ZONE}::{NODE_ROOT}"
 TRASH_ROOT_ID = "TRASH_ROOT"
+JSON_HEADERS = {"Content-Type": "application/json"}
+# Aliases _ensure_prefix resolves without building a prefix
+_SPECIAL_IDS = {NODE_ROOT: CLOUD_DOCS_ZONE_ID_ROOT, TRASH_ROOT_ID: TRASH_ROOT_ID}
+
+# Parallel file transfers for download_directory; kept below the session's connection pool size
+DOWNLOAD_CONCURRENCY = 8
+# Keep-alive connections held for the upload storage and finalize hosts
+UPLOAD_POOL_SIZE = 16
+# Connections the drive session needs per host: both download pipeline stages running at once
+SESSION_POOL_SIZE = 2 * DOWNLOAD_CONCURRENCY
+# Read/write size for streamed download bodies
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Folders per retrieveItemDetailsInFolders request when listing a tree level at once
+LIST_BATCH_SIZE = 32
+# Connection limits for the optional HTTP/2 metadata client
+HTTP2_MAX_CONNECTIONS = 64
+
+@functools.lru_cache(maxsize=1024)
+def _guess_mime(ext: str) -> str:
+    """MIME type for a lowercased extension (no dot). Bulk uploads repeat a handful of these."""
+    content_type, _ = mimetypes.guess_type("x." + ext if ext else "x")
+    return content_type or "application/octet-stream"
+
+class _MultipartFileStream:
+    """
+    A single-file multipart/form-data body that reads the file as it is sent.
+    requests' files= encoder builds the whole body in memory first; this keeps
+    an upload at one socket-buffer of memory. len() gives the exact Content-Length.
+    """
+    def __init__(self, f, field: str, filename: str, content_type: str):
+        self.boundary = uuid.uuid4().hex
+        quoted = filename.replace('\\', '\\\\').replace('"', '%22')
+        head = (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field}"; filename="{quoted}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        ).encode()
+        tail = f'\r\n--{self.boundary}--\r\n'.encode()
+        self._parts = [io.BytesIO(head), f, io.BytesIO(tail)]
+        self._len = len(head) + os.fstat(f.fileno()).st_size + len(tail)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return self._len
+
+    def read(self, size: int = -1) -> bytes:
+        out = b""
+        while self._parts and (size < 0 or len(out) < size):
+            chunk = self._parts[0].read(-1 if size < 0 else size - len(out))
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            out += chunk
+        return out
 
 class iCloudDrive:
     """
     Manages interactions with iCloud Drive.
     """
-    def __init__(self, session: Session, service_root: str, document_root: str, params: Dict[str, Any]):
+    def __init__(self, session: Session, service_root: str, document_root: str, params: Dict[str, Any],
+                 cache_ttl_seconds: Optional[float] = None, use_http2: bool = False):
         if not session:
             raise ValueError("Authenticated requests.Session is required.")
         if not service_root:
@@ -30,17 +123,95 @@ class iCloudDrive:
             raise ValueError("iCloud Drive params dictionary is required.")
 
         self._session = session
+        self._ensure_pool_capacity(session, SESSION_POOL_SIZE)
         self._service_root = service_root
         self._document_root = document_root
         self._params = params
+        # Resolved once; rename/delete/move send it with every mutation
+        self._client_id = params.get("clientId", params.get("client_id"))
+
+        # Optional short-lived listing cache for interactive/bulk callers. Off by default:
+        # the sync engine lists folders precisely to see remote changes.
+        self._cache_ttl = cache_ttl_seconds
+        self._listing_cache: Dict[str, Any] = {} # folder drivewsid -> (expires_at, items)
+        self._listing_lock = threading.Lock()
+        self._index_cache: Dict[int, Any] = {} # id(listing) -> (listing, index); see _child_index
+
+        # Listing/metadata/mutation POSTs over HTTP/2 when asked for and available. Downloads and
+        # uploads stay on requests: body transfer is bandwidth-bound, not request-bound.
+        self._http = self._make_http2_client(session) if use_http2 else None
+
+        # Plain session for the upload transport and finalize calls. They bypass the pyicloud
+        # session on purpose (own headers/cookies), but shouldn't pay a TLS handshake per file.
+        self._content_session = requests.Session()
+        # pool_block=False: a burst past the pool opens an extra connection rather than stalling
+        adapter = HTTPAdapter(pool_connections=UPLOAD_POOL_SIZE, pool_maxsize=UPLOAD_POOL_SIZE, pool_block=False)
+        self._content_session.mount("https://", adapter)
+        # Stateless like the bare requests.post it replaces: auth cookies are passed per call
+        self._content_session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+
+    @staticmethod
+    def _ensure_pool_capacity(session: Session, size: int) -> None:
+        """
+        Widens the session's HTTPS pool if it is smaller than the drive's concurrency, so
+        parallel transfers keep their connections alive instead of overflowing a 10-slot
+        default pool. Sessions already sized by OrchardiCloudClient are left untouched,
+        and an existing retry policy is carried over.
+        """
+        current = session.get_adapter("https://")
+        if getattr(current, "_pool_maxsize", size) >= size:
+            return
+        session.mount("https://", HTTPAdapter(
+            pool_connections=size, pool_maxsize=size, pool_block=False,
+            max_retries=getattr(current, "max_retries", 0),
+        ))
+
+    @staticmethod
+    def _make_http2_client(session: Session):
+        """
+        Builds an httpx HTTP/2 client sharing the session's headers and cookie jar, or
+        returns None (plain requests) if httpx or its h2 extra isn't installed.
+        """
+        if httpx is None:
+            LOGGER.warning("use_http2 requested but httpx is not installed; using HTTP/1.1.")
+            return None
+        try:
+            return httpx.Client(
+                http2=True,
+                headers=dict(session.headers),
+                cookies=session.cookies, # Wraps the same jar, so refreshed auth cookies are seen
+                timeout=60,
+                limits=httpx.Limits(max_connections=HTTP2_MAX_CONNECTIONS,
+                                    max_keepalive_connections=HTTP2_MAX_CONNECTIONS),
+            )
+        except ImportError:
+            LOGGER.warning("use_http2 requested but h2 is not installed (pip install httpx[http2]); using HTTP/1.1.")
+            return None
+
+    def _api_post(self, url: str, body: bytes, headers: Dict[str, str]):
+        """POSTs an encoded body with the drive params, over HTTP/2 when enabled."""
+        if self._http is not None:
+            return self._http.post(url, params=self._params, content=body, headers=headers)
+        return self._session.post(url, params=self._params, data=body, headers=headers)
 
     def _raise_if_error(self, response: Response) -> None:
         """Helper to raise an exception if the response indicates an error."""
-        if not response.ok:
-            error_message = response.reason or "Unknown iCloud API error"
-            LOGGER.error(f"iCloud Drive API Error {response.status_code}: {error_message}")
+        if response.status_code >= 400:
+            # requests calls it reason, httpx reason_phrase
+            error_message = getattr(response, "reason", None) or getattr(response, "reason_phrase", None) \
+                or "Unknown iCloud API error"
+            LOGGER.error("iCloud Drive API Error %s: %s", response.status_code, error_message)
             raise Exception(f"iCloud Drive API Error {response.status_code}: {error_message}")
 
+    def _post_json(self, url: str, body: Any) -> Any:
+        """
+        POSTs body as JSON with the drive params and returns the decoded reply (None if empty).
+        Encodes with _dumps_compact rather than requests' json= so orjson is used when present.
+        """
+        response = self._api_post(url, _dumps_compact(body), JSON_HEADERS)
+        self._raise_if_error(response)
+        return _loads(response.content) if response.content else None
+
     def _ensure_prefix(self, item_id: str, item_type: str = "FILE") -> str:
         """
         Ensures the item_id has the correct prefix (e.g., FILE::com.apple.CloudDocs::UUID).
@@ -48,10 +219,9 @@ class iCloudDrive:
         """
         if not item_id:
             return item_id
-        if item_id == NODE_ROOT:
-            return CLOUD_DOCS_ZONE_ID_ROOT
-        if item_id == TRASH_ROOT_ID:
-            return TRASH_ROOT_ID
+        special = _SPECIAL_IDS.get(item_id)
+        if special is not None:
+            return special
         if "::" in item_id:
             return item_id
         # Construct the prefix based on type
@@ -64,94 +234,153 @@ class iCloudDrive:
         If parent_id is missing, it falls back to ID-only lookup (unreliable).
         """
         if parent_id:
-            LOGGER.info(f"Fetching metadata for item_id={item_id} via parent_id={parent_id}")
+            LOGGER.info("Fetching metadata for item_id=%s via parent_id=%s", item_id, parent_id)
             try:
                 children = self.list_directory(parent_id)
-                for child in children:
-                    # Match against docwsid or drivewsid
-                    # child['drivewsid'] is typically "FILE::...::UUID" or "FOLDER::...::UUID"
-                    # item_id might be just UUID or full ID.
-                    
-                    c_drivewsid = child.get('drivewsid')
-                    c_docwsid = child.get('docwsid')
-                    
-                    if self._ids_match(child, item_id):
-                        return {
-                            "cloud_id": c_docwsid if child.get('type') == 'FILE' else c_drivewsid,
-                            "etag": child.get('etag'),
-                            "name": child.get('name'),
-                            "extension": child.get('extension'),
-                            "size": child.get('size'),
-                            "type": child.get('type'),
-                            "parentId": parent_id, # We know the parent since we listed it
-                            "modified": child.get('dateModified'), # list_directory returns dateModified/dateChanged
-                            "created": child.get('dateCreated'),
-                        }
-                LOGGER.warning(f"Item {item_id} not found in parent {parent_id}")
+                # Match against docwsid or drivewsid
+                # child['drivewsid'] is typically "FILE::...::UUID" or "FOLDER::...::UUID"
+                # item_id might be just UUID or full ID.
+                exact, bare = self._child_index(children)
+                child = exact.get(item_id)
+                if child is None and "::" not in item_id:
+                    child = bare.get(item_id)
+                if child is not None:
+                    return self._child_metadata(child, parent_id)
+                LOGGER.warning("Item %s not found in parent %s", item_id, parent_id)
                 return None
             except Exception as e:
-                LOGGER.error(f"Failed to list parent {parent_id} for metadata lookup: {e}")
+                LOGGER.error("Failed to list parent %s for metadata lookup: %s", parent_id, e)
                 # Fallthrough to direct lookup? Or raise?
                 # User says direct lookup doesn't work. Let's try it as fallback anyway?
                 pass
 
         # Fallback to direct lookup (User says this is broken/unreliable, but we keep it for now if parent_id is unknown)
         # Normalize CloudDocs ID
-        document_id = item_id
-        if "::" in item_id:
-            document_id = item_id.split("::")[-1]
-
-        LOGGER.info(f"Lookup metadata (direct fallback) for item_id={document_id}")
+        document_id = item_id.split("::")[-1]
+        LOGGER.info("Lookup metadata (direct fallback) for item_id=%s", document_id)
+        found = self._lookup_documents([document_id])
+        # A lone lookup has one answer whatever id form it comes back under
+        return found.get(document_id) or next(iter(found.values()), None)
 
+    def get_items_metadata(self, item_ids: List[str], parent_id: Optional[str] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        get_item_metadata() for many items at once: {item_id: metadata or None}.
+        With parent_id the parent is listed once; without it the direct lookup is sent
+        LIST_BATCH_SIZE documents per request instead of one request per item.
+        """
+        if parent_id:
+            exact, bare = self._child_index(self.list_directory(parent_id))
+            result = {}
+            for item_id in item_ids:
+                child = exact.get(item_id)
+                if child is None and "::" not in item_id:
+                    child = bare.get(item_id)
+                result[item_id] = self._child_metadata(child, parent_id) if child is not None else None
+            return result
+
+        document_ids = {item_id: item_id.split("::")[-1] for item_id in item_ids}
+        found: Dict[str, Dict[str, Any]] = {}
+        unique = list(dict.fromkeys(document_ids.values()))
+        for start in range(0, len(unique), LIST_BATCH_SIZE):
+            found.update(self._lookup_documents(unique[start:start + LIST_BATCH_SIZE]))
+        return {item_id: found.get(document_id) for item_id, document_id in document_ids.items()}
+
+    def _lookup_documents(self, document_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """One docws/lookup request for bare document ids; returns {documentId: metadata} for those found."""
         payload = {
-            "documents": [
-                {"documentId": document_id}
-            ]
+            "documents": [{"documentId": document_id} for document_id in document_ids]
         }
 
-        response = self._session.post(
-            f"{self._document_root}/docws/lookup",
-            params=self._params,
-            json=payload,
-        )
+        response = self._api_post(f"{self._document_root}/docws/lookup", _dumps_compact(payload), JSON_HEADERS)
 
         # Explicit status handling
         if response.status_code == 404:
-            return None  # item deleted or inaccessible
+            return {}  # item deleted or inaccessible
 
         if response.status_code == 204:
-            return None  # no content = gone
+            return {}  # no content = gone
 
         self._raise_if_error(response)
 
         # Guard: response may be empty or non-JSON
         if not response.content:
-            LOGGER.warning(f"No content returned for item {document_id}")
-            return None
+            LOGGER.warning("No content returned for items %s", document_ids)
+            return {}
 
         try:
-            data = response.json()
+            data = _loads(response.content)
         except ValueError:
-            LOGGER.error(f"Non-JSON response for item {document_id}: {response.text[:200]}")
+            LOGGER.error("Non-JSON response for items %s: %s", document_ids, response.text[:200])
             raise
 
-        docs = data.get("documents")
-        if not docs:
-            return None
-
-        doc = docs[0]
+        found = {}
+        for doc in data.get("documents") or []:
+            found[doc.get("documentId")] = {
+                "cloud_id": doc.get("documentId"),
+                "etag": doc.get("etag"),
+                "name": doc.get("name"),
+                "extension": doc.get("extension"),
+                "size": doc.get("size"),
+                "type": doc.get("type"),  # FILE / FOLDER
+                "parentId": doc.get("parentId"),
+                "modified": doc.get("modified"),
+                "created": doc.get("created"),
+            }
+        return found
 
+    @staticmethod
+    def _child_metadata(child: Dict[str, Any], parent_id: str) -> Dict[str, Any]:
+        """Shapes a listing entry like get_item_metadata's result."""
         return {
-            "cloud_id": doc.get("documentId"),
-            "etag": doc.get("etag"),
-            "name": doc.get("name"),
-            "extension": doc.get("extension"),
-            "size": doc.get("size"),
-            "type": doc.get("type"),  # FILE / FOLDER
-            "parentId": doc.get("parentId"),
-            "modified": doc.get("modified"),
-            "created": doc.get("created"),
+            "cloud_id": child.get('docwsid') if child.get('type') == 'FILE' else child.get('drivewsid'),
+            "etag": child.get('etag'),
+            "name": child.get('name'),
+            "extension": child.get('extension'),
+            "size": child.get('size'),
+            "type": child.get('type'),
+            "parentId": parent_id, # We know the parent since we listed it
+            "modified": child.get('dateModified'), # list_directory returns dateModified/dateChanged
+            "created": child.get('dateCreated'),
         }
+
+    def list_directory_as_metadata(self, parent_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        get_item_metadata() for every child of parent_id from a single listing, keyed by
+        both docwsid and drivewsid. Use this instead of calling get_item_metadata per child.
+        """
+        exact, _ = self._child_index(self.list_directory(parent_id))
+        shaped: Dict[int, Dict[str, Any]] = {}
+        result = {}
+        for key, child in exact.items():
+            meta = shaped.get(id(child))
+            if meta is None:
+                meta = shaped[id(child)] = self._child_metadata(child, parent_id)
+            result[key] = meta
+        return result
+
+    def _child_index(self, children: List[Dict[str, Any]]):
+        """
+        ({docwsid/drivewsid: child}, {bare UUID: child}) for a listing, equivalent to scanning
+        with _ids_match but O(1) per lookup. Memoized per listing object, so with the listing
+        cache on, repeated lookups in the same folder build it once.
+        """
+        cached = self._index_cache.get(id(children))
+        if cached and cached[0] is children:
+            return cached[1]
+        exact: Dict[str, Dict[str, Any]] = {}
+        bare: Dict[str, Dict[str, Any]] = {}
+        for child in children:
+            for key in (child.get('docwsid'), child.get('drivewsid')):
+                if key:
+                    exact.setdefault(key, child)
+                    if "::" in key:
+                        bare.setdefault(key.rsplit("::", 1)[1], child)
+        if self._cache_ttl:
+            if len(self._index_cache) >= 256: # Expired listings leave entries behind
+                self._index_cache.clear()
+            self._index_cache[id(children)] = (children, (exact, bare))
+        return exact, bare
+
     def _ids_match(self, item, search_id):
         # Helper to match ID against docwsid, drivewsid, or bare UUID
         if item.get('docwsid') == search_id: return True
@@ -166,32 +395,93 @@ class iCloudDrive:
     def list_directory(self, folder_id: Optional[str] = None) -> List[Dict[str, Any]]:
         target_folder_id = folder_id if folder_id is not None else CLOUD_DOCS_ZONE_ID_ROOT
         target_folder_id = self._ensure_prefix(target_folder_id, "FOLDER")
-        
-        LOGGER.info(f"Listing directory for folder_id: {target_folder_id}")
+        return self._cached_listing(target_folder_id, self._fetch_directory)
+
+    def _cached_listing(self, key: str, fetch) -> List[Dict[str, Any]]:
+        """Returns fetch(key), served from the listing cache while its TTL lasts (if enabled)."""
+        if self._cache_ttl:
+            with self._listing_lock:
+                cached = self._listing_cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+
+        items = fetch(key)
+        if self._cache_ttl:
+            with self._listing_lock:
+                self._listing_cache[key] = (time.monotonic() + self._cache_ttl, items)
+        return items
+
+    def invalidate_listings(self, *folder_ids: str) -> None:
+        """
+        Drops cached listings for the given folders, or all of them when called without
+        arguments (mutations whose source parent isn't known: rename, delete, move...).
+        """
+        if not self._cache_ttl:
+            return
+        with self._listing_lock:
+            self._index_cache.clear()
+            if not folder_ids:
+                self._listing_cache.clear()
+            for folder_id in folder_ids:
+                self._listing_cache.pop(self._ensure_prefix(folder_id, "FOLDER"), None)
+
+    def _fetch_directory(self, target_folder_id: str) -> List[Dict[str, Any]]:
+        LOGGER.info("Listing directory for folder_id: %s", target_folder_id)
 
         request_data = [{"drivewsid": target_folder_id, "partialData": False}]
         
         try:
-            response = self._session.post(
-                f"{self._service_root}/retrieveItemDetailsInFolders",
-                params=self._params,
-                json=request_data,
-            )
-            self._raise_if_error(response)
-            
-            items_data = response.json()
-            if items_data and isinstance(items_data, list) and len(items_data) > 0:
-                folder_details = items_data[0]
-                if "items" in folder_details:
-                    return folder_details["items"]
-                else:
-                    return [folder_details]
-            return []
+            items_data = self._post_json(f"{self._service_root}/retrieveItemDetailsInFolders", request_data)
+            if not items_data or not isinstance(items_data, list):
+                return []
+            folder_details = items_data[0]
+            items = folder_details.get("items")
+            return items if items is not None else [folder_details]
         except Exception as e:
-            LOGGER.error(f"Error listing directory: {e}")
+            LOGGER.error("Error listing directory: %s", e)
             raise
 
+    def list_directories(self, folder_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Lists several folders with one retrieveItemDetailsInFolders call per LIST_BATCH_SIZE ids.
+        Returns {prefixed drivewsid: items}; cached listings are served without a request.
+        """
+        targets = [self._ensure_prefix(f, "FOLDER") for f in folder_ids]
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        if self._cache_ttl:
+            now = time.monotonic()
+            with self._listing_lock:
+                for target in targets:
+                    cached = self._listing_cache.get(target)
+                    if cached and cached[0] > now:
+                        results[target] = cached[1]
+        missing = [t for t in dict.fromkeys(targets) if t not in results]
+
+        for start in range(0, len(missing), LIST_BATCH_SIZE):
+            batch = missing[start:start + LIST_BATCH_SIZE]
+            LOGGER.info("Listing %s directories in one request", len(batch))
+            request_data = [{"drivewsid": folder_id, "partialData": False} for folder_id in batch]
+            try:
+                entries = self._post_json(f"{self._service_root}/retrieveItemDetailsInFolders", request_data) or []
+            except Exception as e:
+                LOGGER.error("Error listing directories: %s", e)
+                raise
+
+            fetched = {entry.get("drivewsid"): entry.get("items", []) for entry in entries if isinstance(entry, dict)}
+            for folder_id in batch:
+                results[folder_id] = fetched.get(folder_id, [])
+            if self._cache_ttl:
+                expires = time.monotonic() + self._cache_ttl
+                with self._listing_lock:
+                    for folder_id in batch:
+                        self._listing_cache[folder_id] = (expires, results[folder_id])
+        return results
+
     def list_trash(self) -> List[Dict[str, Any]]:
+        # Cached under TRASH_ROOT_ID; delete/recover clear the whole cache
+        return self._cached_listing(TRASH_ROOT_ID, self._fetch_trash)
+
+    def _fetch_trash(self, _key: str = TRASH_ROOT_ID) -> List[Dict[str, Any]]:
         LOGGER.info("Listing Trash")
         request_data = [{
             "drivewsid": TRASH_ROOT_ID,
@@ -200,21 +490,12 @@ class iCloudDrive:
         }]
         
         try:
-            response = self._session.post(
-                f"{self._service_root}/retrieveItemDetailsInFolders",
-                params=self._params,
-                json=request_data,
-            )
-            self._raise_if_error(response)
-            
-            items_data = response.json()
-            if items_data and isinstance(items_data, list) and len(items_data) > 0:
-                folder_details = items_data[0]
-                if "items" in folder_details:
-                    return folder_details["items"]
-            return []
+            items_data = self._post_json(f"{self._service_root}/retrieveItemDetailsInFolders", request_data)
+            if not items_data or not isinstance(items_data, list):
+                return []
+            return items_data[0].get("items") or []
         except Exception as e:
-            LOGGER.error(f"Error listing trash: {e}")
+            LOGGER.error("Error listing trash: %s", e)
             raise
 
     def _get_download_url(self, file_id: str, zone: str = CLOUD_DOCS_ZONE) -> str:
@@ -231,7 +512,7 @@ class iCloudDrive:
                 params=file_params,
             )
             self._raise_if_error(response)
-            response_json = response.json()
+            response_json = _loads(response.content)
         except Exception as e:
             raise Exception(f"Failed to get download URL for {file_id}") from e
 
@@ -246,8 +527,9 @@ class iCloudDrive:
         
         return download_url
 
-    def download_file(self, file_id: str, zone: str = CLOUD_DOCS_ZONE, local_path: Optional[str] = None) -> str:
-        LOGGER.info(f"Attempting to download file with ID: {file_id}")
+    def download_file(self, file_id: str, zone: str = CLOUD_DOCS_ZONE, local_path: Optional[str] = None,
+                      expected_size: Optional[int] = None) -> str:
+        LOGGER.info("Attempting to download file with ID: %s", file_id)
         
         download_url = self._get_download_url(file_id, zone)
 
@@ -258,17 +540,31 @@ class iCloudDrive:
             LOGGER.warning("Using URL filename because parent_id for metadata fetch is unknown in this context.")
 
         # Step 2: Download
-        LOGGER.info(f"Downloading from {download_url} to {local_path}")
+        return self._stream_to_file(file_id, download_url, local_path, expected_size)
+
+    def _stream_to_file(self, file_id: str, download_url: str, local_path: str, expected_size: Optional[int] = None) -> str:
+        """
+        Streams a resolved download URL into local_path via a .part file and an atomic replace.
+        With expected_size (from the listing), the .part file's blocks are reserved up front.
+        """
+        LOGGER.info("Downloading from %s to %s", download_url, local_path)
         temp_path = f"{local_path}.part"
         try:
             file_content_response = self._session.get(download_url, stream=True)
             self._raise_if_error(file_content_response)
             with open(temp_path, 'wb') as f:
-                for chunk in file_content_response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+                if expected_size and hasattr(os, "posix_fallocate"):
+                    try:
+                        os.posix_fallocate(f.fileno(), 0, int(expected_size))
+                    except (OSError, ValueError):
+                        pass # Unsupported by the filesystem: just grow as we write
+                # Straight from the urllib3 stream (still gunzipped if needed), no generator per chunk
+                file_content_response.raw.decode_content = True
+                shutil.copyfileobj(file_content_response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+                f.truncate() # Drop any reserved tail if the body came in shorter
             
-            # Atomic move
-            os.rename(temp_path, local_path)
+            # Atomic move (replaces an existing file on every platform)
+            os.replace(temp_path, local_path)
             return local_path
         except Exception as e:
             if os.path.exists(temp_path):
@@ -277,7 +573,7 @@ class iCloudDrive:
 
     def download_file_part(self, file_id: str, start_byte: int, end_byte: int, zone: str = CLOUD_DOCS_ZONE) -> bytes:
         """Downloads a specific byte range of a file."""
-        # LOGGER.debug(f"Downloading part {start_byte}-{end_byte} for {file_id}") # verbose
+        # LOGGER.debug("Downloading part %s-%s for %s", start_byte, end_byte, file_id) # verbose
         download_url = self._get_download_url(file_id, zone)
         
         headers = {"Range": f"bytes={start_byte}-{end_byte}"}
@@ -287,14 +583,88 @@ class iCloudDrive:
         
         return response.content
 
-    def download_directory(self, folder_id: str, local_path: str):
-        full_folder_id = self._ensure_prefix(folder_id, "FOLDER")
-        LOGGER.info(f"Downloading directory {full_folder_id} to {local_path}")
-        
+    @contextlib.contextmanager
+    def _download_pipeline(self, max_workers: int):
+        """
+        Yields submit(file_id, local_path, expected_size=None) -> Future. URL resolution (download/by_id) and body
+        streaming run on separate pools, so the next file's lookup round-trip overlaps the
+        current file's transfer instead of queueing behind it. Exits once every download is done.
+        """
+        url_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="orchard-dl-url")
+        body_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="orchard-dl-body")
+        pending = []
+
+        def submit(file_id: str, local_path: str, expected_size: Optional[int] = None) -> concurrent.futures.Future:
+            result = concurrent.futures.Future()
+
+            def on_body(body):
+                if body.exception(): result.set_exception(body.exception())
+                else: result.set_result(body.result())
+
+            def on_url(url_future):
+                if url_future.exception():
+                    result.set_exception(url_future.exception())
+                    return
+                body_pool.submit(self._stream_to_file, file_id, url_future.result(), local_path, expected_size).add_done_callback(on_body)
+
+            url_pool.submit(self._get_download_url, file_id).add_done_callback(on_url)
+            pending.append(result)
+            return result
+
+        try:
+            yield submit
+            concurrent.futures.wait(pending) # Body submissions happen while url_pool is still open
+        finally:
+            url_pool.shutdown(wait=True)
+            body_pool.shutdown(wait=True)
+
+    def download_files(self, targets: List[tuple], max_workers: int = DOWNLOAD_CONCURRENCY) -> List[str]:
+        """
+        Downloads (file_id, local_path) pairs through the two-stage pipeline.
+        Returns the local paths; raises the first failure once all transfers have finished.
+        """
+        with self._download_pipeline(max_workers) as submit:
+            futures = [submit(file_id, local_path) for file_id, local_path in targets]
+        return [future.result() for future in futures]
+
+    def download_directory(self, folder_id: str, local_path: str, max_workers: int = DOWNLOAD_CONCURRENCY) -> List[str]:
+        """
+        Downloads a folder tree. The tree is walked breadth-first from a queue of folders,
+        LIST_BATCH_SIZE folders per list_directories() call, while files go through the
+        download pipeline as soon as their folder has been listed.
+        Returns the downloaded files' local paths in listing order.
+        Raises the first download error after the remaining transfers have finished.
+        """
+        futures = []
+        completed = itertools.count(1) # next() on a count is atomic, safe from the pool threads
+
+        def log_progress(future):
+            if not future.exception():
+                LOGGER.info("Downloaded %s (%s/%s queued so far)", future.result(), next(completed), len(futures))
+
+        def submit_logged(file_id, item_local_path, expected_size=None):
+            future = submit(file_id, item_local_path, expected_size)
+            future.add_done_callback(log_progress)
+            return future
+
+        with self._download_pipeline(max_workers) as submit:
+            frontier = deque([(self._ensure_prefix(folder_id, "FOLDER"), local_path)])
+            while frontier:
+                # One request's worth at a time, so a wide level starts downloading before it is fully listed
+                batch = [frontier.popleft() for _ in range(min(len(frontier), LIST_BATCH_SIZE))]
+                listings = self.list_directories([full_folder_id for full_folder_id, _ in batch])
+                for full_folder_id, folder_path in batch:
+                    LOGGER.info("Downloading directory %s to %s", full_folder_id, folder_path)
+                    subfolders = {}
+                    self._queue_folder_items(listings.get(full_folder_id, []), folder_path, submit_logged, futures, subfolders)
+                    frontier.extend(subfolders.items())
+        return [future.result() for future in futures]
+
+    def _queue_folder_items(self, contents: List[Dict[str, Any]], local_path: str, submit, futures: list, subfolders: dict):
+        """Submits a folder's files for download and collects its subfolders ({drivewsid: local path})."""
         if not os.path.exists(local_path):
             os.makedirs(local_path)
         
-        contents = self.list_directory(full_folder_id)
         for item in contents:
             name = item.get('name')
             if not name: continue
@@ -310,59 +680,51 @@ class iCloudDrive:
                 if ext and not safe_name.endswith(f".{ext}"):
                     item_local_path += f".{ext}"
                 file_id = item.get('docwsid', item.get('drivewsid'))
-                self.download_file(file_id, local_path=item_local_path)
+                futures.append(submit(file_id, item_local_path, item.get('size')))
                 
             elif item_type == 'FOLDER':
-                self.download_directory(item['drivewsid'], item_local_path)
+                subfolders[item['drivewsid']] = item_local_path
 
     def rename_item(self, item_id: str, etag: str, new_name: str) -> Dict[str, Any]:
         drivewsid = self._ensure_prefix(item_id)
-        LOGGER.info(f"Renaming item ID: {drivewsid} to '{new_name}'")
+        LOGGER.info("Renaming item ID: %s to '%s'", drivewsid, new_name)
         request_data = {
             "items": [{
                 "drivewsid": drivewsid,
                 "etag": etag,
                 "name": new_name,
-                "clientId": self._params.get("clientId", self._params.get("client_id")),
+                "clientId": self._client_id,
             }]
         }
 
         try:
-            response = self._session.post(
-                f"{self._service_root}/renameItems",
-                params=self._params,
-                json=request_data,
-            )
-            self._raise_if_error(response)
-            return response.json()
+            result = self._post_json(f"{self._service_root}/renameItems", request_data)
+            self.invalidate_listings()
+            return result
         except Exception as e:
             raise Exception(f"Failed to rename item {item_id}") from e
 
     def delete_item(self, item_id: str, etag: str) -> Dict[str, Any]:
         drivewsid = self._ensure_prefix(item_id)
-        LOGGER.info(f"Deleting item ID: {drivewsid}")
+        LOGGER.info("Deleting item ID: %s", drivewsid)
         request_data = {
             "items": [{
                 "drivewsid": drivewsid,
                 "etag": etag,
-                "clientId": self._params.get("clientId", self._params.get("client_id")),
+                "clientId": self._client_id,
             }]
         }
 
         try:
-            response = self._session.post(
-                f"{self._service_root}/deleteItems",
-                params=self._params,
-                json=request_data,
-            )
-            self._raise_if_error(response)
-            return response.json()
+            result = self._post_json(f"{self._service_root}/deleteItems", request_data)
+            self.invalidate_listings()
+            return result
         except Exception as e:
             raise Exception(f"Failed to delete item {item_id}") from e
 
     def recover_item(self, item_id: str, etag: str) -> Dict[str, Any]:
         drivewsid = self._ensure_prefix(item_id)
-        LOGGER.info(f"Recovering item ID: {drivewsid} from Trash")
+        LOGGER.info("Recovering item ID: %s from Trash", drivewsid)
         request_data = {
             "items": [{
                 "drivewsid": drivewsid,
@@ -371,19 +733,13 @@ class iCloudDrive:
         }
 
         try:
-            response = self._session.post(
-                f"{self._service_root}/putBackItemsFromTrash",
-                params=self._params,
-                json=request_data,
-            )
-            self._raise_if_error(response)
-            return response.json()
+            result = self._post_json(f"{self._service_root}/putBackItemsFromTrash", request_data)
+            self.invalidate_listings()
+            return result
         except Exception as e:
             raise Exception(f"Failed to recover item {item_id}") from e
 
     def upload_file(self, local_path: str, parent_folder_id: str, remote_name: Optional[str] = None) -> Dict[str, Any]:
-        import requests 
-
         # Cleanup ID: If it's the complex ID, try to simplify it for the JSON payload
         # The web client sends "root" or the bare UUID for the parent.
         if parent_folder_id == CLOUD_DOCS_ZONE_ID_ROOT:
@@ -393,7 +749,7 @@ class iCloudDrive:
         else:
             simple_parent_id = parent_folder_id
 
-        LOGGER.info(f"Uploading '{local_path}' to parent: {simple_parent_id}")
+        LOGGER.info("Uploading '%s' to parent: %s", local_path, simple_parent_id)
 
         if not os.path.exists(local_path):
             raise FileNotFoundError(f"Local file not found: {local_path}")
@@ -402,9 +758,7 @@ class iCloudDrive:
         filename = remote_name if remote_name else os.path.basename(local_path)
         
         # 1. Force strict MIME type
-        content_type, _ = mimetypes.guess_type(filename)
-        if content_type is None:
-            content_type = "application/octet-stream"
+        content_type = _guess_mime(os.path.splitext(filename)[1][1:].lower())
 
         # --- STEP 1: Authorize (Get Upload URL) ---
         LOGGER.info("Step 1/3: Requesting upload authorization...")
@@ -416,59 +770,50 @@ class iCloudDrive:
         }
 
         try:
-            response = self._session.post(
-                f"{self._document_root}/ws/{CLOUD_DOCS_ZONE}/upload/web",
-                params=self._params,
-                json=upload_req_data,
-            )
-            self._raise_if_error(response)
-            upload_info = response.json()[0]
+            upload_info = self._post_json(f"{self._document_root}/ws/{CLOUD_DOCS_ZONE}/upload/web", upload_req_data)[0]
             document_id = upload_info["document_id"]
             upload_url = upload_info["url"]
         except Exception as e:
-            LOGGER.error(f"Step 1 Failed: {e}")
+            LOGGER.error("Step 1 Failed: %s", e)
             raise
 
         # --- STEP 2: Transport (Send Content) ---
-        LOGGER.info(f"Step 2/3: Transporting {file_size} bytes to storage server...")
+        LOGGER.info("Step 2/3: Transporting %s bytes to storage server...", file_size)
         
         try:
             with open(local_path, 'rb') as f:
+                body = _MultipartFileStream(f, "files", filename, content_type)
                 headers = {
                     "User-Agent": self._session.headers.get("User-Agent", "Mozilla/5.0"),
                     "Accept": "*/*",
                     "Connection": "keep-alive",
-                    "Content-Length": str(file_size),
+                    "Content-Type": body.content_type,
+                    "Content-Length": str(len(body)),
                     "Origin": "https://www.icloud.com",
                     "Referer": "https://www.icloud.com/"
                 }
 
-                files_payload = {
-                    "files": (filename, f, content_type)
-                }
-
-                content_response = requests.post(
+                content_response = self._content_session.post(
                     upload_url, 
-                    files=files_payload,
+                    data=body,
                     headers=headers,
                     cookies=self._session.cookies,
                     timeout=300
                 )
                 
             if not content_response.ok:
-                LOGGER.error(f"Upload Server Rejected: {content_response.status_code}")
+                LOGGER.error("Upload Server Rejected: %s", content_response.status_code)
                 raise Exception(f"Upload server rejected file: {content_response.status_code}")
                 
-            file_info = content_response.json()["singleFile"]
+            file_info = _loads(content_response.content)["singleFile"]
         except Exception as e:
-            LOGGER.error(f"Step 2 Failed: {e}")
+            LOGGER.error("Step 2 Failed: %s", e)
             raise
 
         # --- STEP 3: Finalize (Link File) ---
         LOGGER.info("Step 3/3: Finalizing and linking file...")
         
         # Helper to get current time in MS
-        import time
         now_ms = int(time.time() * 1000)
 
         # Construct the 'data' dictionary exactly as seen in your log
@@ -503,32 +848,33 @@ class iCloudDrive:
 
         try:
             # Send as text/plain to avoid CORS/Preflight header issues, matching web behavior
-            json_payload = json.dumps(finalize_data, separators=(',', ':'))
+            json_payload = _dumps_compact(finalize_data)
 
             headers = {
                 "Content-Type": "text/plain",
                 "Origin": "https://www.icloud.com",
                 "Referer": "https://www.icloud.com/",
-                "Cookie": "; ".join([f"{k}={v}" for k, v in self._session.cookies.items()]) # Manually pass cookies
             }
 
-            response = requests.post(
+            response = self._content_session.post(
                 f"{self._document_root}/ws/{CLOUD_DOCS_ZONE}/update/documents",
                 params=self._params,
                 data=json_payload,
-                headers=headers
+                headers=headers,
+                cookies=self._session.cookies, # Same auth cookies as the transport step
             )
             
             if not response.ok:
-                LOGGER.error(f"Step 3 Failed: {response.status_code}")
-                LOGGER.error(f"Response: {response.text}")
+                LOGGER.error("Step 3 Failed: %s", response.status_code)
+                LOGGER.error("Response: %s", response.text)
                 response.raise_for_status()
 
-            LOGGER.info(f"Upload Successful. Doc ID: {document_id}")
+            LOGGER.info("Upload Successful. Doc ID: %s", document_id)
+            self.invalidate_listings(parent_folder_id)
             
             # Parse response to ensure we return a useful dict with document_id
             try:
-                resp_data = response.json()
+                resp_data = _loads(response.content)
                 if isinstance(resp_data, list) and len(resp_data) > 0:
                     resp_data = resp_data[0]
                 
@@ -545,23 +891,17 @@ class iCloudDrive:
                 return {"document_id": document_id}
 
         except Exception as e:
-            LOGGER.error(f"Step 3 Failed: {e}")
+            LOGGER.error("Step 3 Failed: %s", e)
             raise
 
     def move_item(self, item_id: str, etag: str, new_parent_folder_id: str) -> Dict[str, Any]:
         drivewsid = self._ensure_prefix(item_id)
         dest_id = self._ensure_prefix(new_parent_folder_id, "FOLDER")
         
-        # Use existing clientId from params if available (persistent), otherwise generate new one?
-        # Re-using clientId from params might cause issues if it's treated as a transaction ID.
-        # But delete_items uses params['clientId'].
-        # Let's try generating a new one if it fails, or maybe just use the item_id like trash?
-        # Strategy: Use params['clientId'] first, similar to delete_item.
-        client_id = self._params.get("clientId", self._params.get("client_id"))
-        if not client_id:
-            client_id = str(uuid.uuid4())
-
-        LOGGER.info(f"Moving item {drivewsid} to {dest_id}")
+        # Use the session's clientId (as rename/delete do); a fresh one only if the params carry none.
+        client_id = self._client_id or str(uuid.uuid4())
+
+        LOGGER.info("Moving item %s to %s", drivewsid, dest_id)
         request_data = {
                 "destinationDrivewsId": dest_id,
             "items": [{
@@ -572,26 +912,23 @@ class iCloudDrive:
         }
         
         try:
-            response = self._session.post(
-                f"{self._service_root}/moveItems",
-                params=self._params,
-                json=request_data,
-            )
-            self._raise_if_error(response)
-            return response.json()
+            result = self._post_json(f"{self._service_root}/moveItems", request_data)
+            self.invalidate_listings()
+            return result
         except Exception as e:
             # If it's a PyiCloudAPIResponseException, the response object might be lost if not attached.
             # But we can try to log what we have.
-            LOGGER.error(f"Failed to move item. Payload: {json.dumps(request_data)}")
+            if LOGGER.isEnabledFor(logging.ERROR):
+                LOGGER.error("Failed to move item. Payload: %s", _dumps_compact(request_data).decode())
             if hasattr(e, 'response') and e.response: # If exception has response attached
-                 LOGGER.error(f"Response: {e.response.text}")
+                 LOGGER.error("Response: %s", e.response.text)
             raise Exception(f"Failed to move item {item_id}") from e
 
     def copy_item(self, item_id: str, etag: str, new_parent_folder_id: str) -> Dict[str, Any]:
         drivewsid = self._ensure_prefix(item_id)
         dest_id = self._ensure_prefix(new_parent_folder_id, "FOLDER")
         
-        LOGGER.info(f"Copying item {drivewsid} to {dest_id}")
+        LOGGER.info("Copying item %s to %s", drivewsid, dest_id)
         request_data = {
             "items": [{
                 "drivewsid": drivewsid,
@@ -602,19 +939,15 @@ class iCloudDrive:
         }
         
         try:
-            response = self._session.post(
-                f"{self._service_root}/copyItems",
-                params=self._params,
-                json=request_data,
-            )
-            self._raise_if_error(response)
-            return response.json()
+            result = self._post_json(f"{self._service_root}/copyItems", request_data)
+            self.invalidate_listings(dest_id)
+            return result
         except Exception as e:
             raise Exception(f"Failed to copy item {item_id}") from e
 
     def create_folder(self, parent_folder_id: str, folder_name: str) -> Dict[str, Any]:
         full_parent_id = self._ensure_prefix(parent_folder_id, "FOLDER")
-        LOGGER.info(f"Creating folder '{folder_name}' in parent ID: {full_parent_id}")
+        LOGGER.info("Creating folder '%s' in parent ID: %s", folder_name, full_parent_id)
         temp_client_id: str = f"FOLDER::UNKNOWN_ZONE::TempId-{uuid.uuid4()}"
         
         request_data = {
@@ -626,13 +959,9 @@ class iCloudDrive:
         }
 
         try:
-            response = self._session.post(
-                f"{self._service_root}/createFolders",
-                params=self._params,
-                json=request_data,
-            )
-            self._raise_if_error(response)
-            return response.json()
+            result = self._post_json(f"{self._service_root}/createFolders", request_data)
+            self.invalidate_listings(full_parent_id)
+            return result
         except Exception as e:
             raise Exception(f"Failed to create folder '{folder_name}'") from e
 
@@ -682,11 +1011,26 @@ if __name__ == "__main__":
             session=client.session,
             service_root=drive_service_root,
             document_root=drive_document_root,
-            params=client._pyicloud_service.params
+            params=client._pyicloud_service.params,
+            cache_ttl_seconds=30, # cd/download/inspect re-list the current folder every command
         )
 
         current_folder_id = CLOUD_DOCS_ZONE_ID_ROOT
         current_path = "/"
+        last_index = [None, None] # [listing, index]; list_directory hands back the same list while cached
+
+        def index_contents(contents):
+            """{'any'|'FILE'|'FOLDER': {name: item}} for a listing, first match wins like the old scans."""
+            if last_index[0] is contents:
+                return last_index[1]
+            index = {"any": {}, "FILE": {}, "FOLDER": {}}
+            for i in contents:
+                name = i.get("name")
+                index["any"].setdefault(name, i)
+                if i.get("type") in index:
+                    index[i.get("type")].setdefault(name, i)
+            last_index[:] = [contents, index]
+            return index
         
         print("\nCommands: ls, ls_trash, cd <dir>, inspect <name>, download <file> <path>, download_dir <folder> <path>, upload <path>, mkdir <name>, rename <old> <new>, move <name> <dest>, copy <name> <dest>, delete <name>, rmdir <name>, recover <name>, purge <name>, exit")
 
@@ -721,7 +1065,7 @@ if __name__ == "__main__":
                         continue
                     
                     contents = icloud_drive.list_directory(current_folder_id)
-                    found = next((i for i in contents if i.get("name") == target and i.get("type") == "FOLDER"), None)
+                    found = index_contents(contents)["FOLDER"].get(target)
                     if found:
                         current_folder_id = found["drivewsid"]
                         current_path = os.path.join(current_path, target)
@@ -742,7 +1086,7 @@ if __name__ == "__main__":
                     if not args: print("Usage: download <filename> [local_path]"); continue
                     name = args[0]
                     contents = icloud_drive.list_directory(current_folder_id)
-                    found = next((i for i in contents if i.get("name") == name and i.get("type") == "FILE"), None)
+                    found = index_contents(contents)["FILE"].get(name)
                     if found:
                         local_p = args[1] if len(args) > 1 else None
                         file_id = found.get("docwsid", found.get("drivewsid"))
@@ -755,10 +1099,10 @@ if __name__ == "__main__":
                     if len(args) < 2: print("Usage: download_dir <foldername> <local_path>"); continue
                     name, local_p = args[0], args[1]
                     contents = icloud_drive.list_directory(current_folder_id)
-                    found = next((i for i in contents if i.get("name") == name and i.get("type") == "FOLDER"), None)
+                    found = index_contents(contents)["FOLDER"].get(name)
                     if found:
-                        icloud_drive.download_directory(found["drivewsid"], local_path=local_p)
-                        print("Directory Downloaded.")
+                        files = icloud_drive.download_directory(found["drivewsid"], local_path=local_p)
+                        print(f"Directory Downloaded ({len(files)} files).")
                     else:
                         print("Folder not found.")
 
@@ -766,14 +1110,14 @@ if __name__ == "__main__":
                     if not args: print("Usage: inspect <name>"); continue
                     name = args[0]
                     contents = icloud_drive.list_directory(current_folder_id)
-                    found = next((i for i in contents if i.get("name") == name), None)
+                    found = index_contents(contents)["any"].get(name)
                     if found:
                         print(json.dumps(found, indent=2))
                         print("\n--- Detailed Metadata Check ---")
                         # Pass parent_id so metadata fetch can succeed for files
                         meta_id = found.get("drivewsid", found.get("docwsid"))
                         parent_id = current_folder_id
-                        meta = icloud_drive.get_item_metadata(meta_id)
+                        meta = icloud_drive.get_item_metadata(meta_id, parent_id=parent_id)
                         print(json.dumps(meta, indent=2))
                     else:
                         print("Item not found.")
@@ -782,7 +1126,7 @@ if __name__ == "__main__":
                     if not args: print(f"Usage: {cmd} <name>"); continue
                     name = args[0]
                     contents = icloud_drive.list_directory(current_folder_id)
-                    found = next((i for i in contents if i.get("name") == name), None)
+                    found = index_contents(contents)["any"].get(name)
                     if found:
                         icloud_drive.delete_item(found["drivewsid"], found["etag"])
                         print("Deleted (Moved to Trash).")
@@ -793,7 +1137,7 @@ if __name__ == "__main__":
                     if not args: print("Usage: recover <name_in_trash>"); continue
                     name = args[0]
                     contents = icloud_drive.list_trash()
-                    found = next((i for i in contents if i.get("name") == name), None)
+                    found = index_contents(contents)["any"].get(name)
                     if found:
                         icloud_drive.recover_item(found["drivewsid"], found["etag"])
                         print("Recovered.")
@@ -804,7 +1148,7 @@ if __name__ == "__main__":
                     if not args: print("Usage: purge <name_in_trash>"); continue
                     name = args[0]
                     contents = icloud_drive.list_trash()
-                    found = next((i for i in contents if i.get("name") == name), None)
+                    found = index_contents(contents)["any"].get(name)
                     if found:
                         icloud_drive.delete_item(found["drivewsid"], found["etag"])
                         print("Permanently deleted.")
@@ -814,10 +1158,10 @@ if __name__ == "__main__":
                 elif cmd in ["move", "mv"]:
                     if len(args) < 2: print("Usage: move <name> <dest_folder_name>"); continue
                     name, dest_name = args[0], args[1]
-                    contents = icloud_drive.list_directory(current_folder_id)
+                    index = index_contents(icloud_drive.list_directory(current_folder_id))
                     
-                    item = next((i for i in contents if i.get("name") == name), None)
-                    dest = next((i for i in contents if i.get("name") == dest_name and i.get("type") == "FOLDER"), None)
+                    item = index["any"].get(name)
+                    dest = index["FOLDER"].get(dest_name)
                     
                     if item and dest:
                         icloud_drive.move_item(item["drivewsid"], item["etag"], dest["drivewsid"])
@@ -828,10 +1172,10 @@ if __name__ == "__main__":
                 elif cmd == "copy":
                     if len(args) < 2: print("Usage: copy <name> <dest_folder_name>"); continue
                     name, dest_name = args[0], args[1]
-                    contents = icloud_drive.list_directory(current_folder_id)
+                    index = index_contents(icloud_drive.list_directory(current_folder_id))
                     
-                    item = next((i for i in contents if i.get("name") == name), None)
-                    dest = next((i for i in contents if i.get("name") == dest_name and i.get("type") == "FOLDER"), None)
+                    item = index["any"].get(name)
+                    dest = index["FOLDER"].get(dest_name)
                     
                     if item and dest:
                         icloud_drive.copy_item(item["drivewsid"], item["etag"], dest["drivewsid"])
@@ -52,10 +52,15 @@ class DriveObject(OrchardObject):
         return os.path.join(ORCHARD_CACHE_DIR, self.id)
 
     def update_cache_entry(self):
+        # open_count is owned by the atomic increment/decrement in OrchardDB: never written from
+        # a loaded copy, which could be stale by the time it lands. Upsert keeps it (and pinned) intact.
         self.db.execute("""
-            INSERT OR REPLACE INTO drive_cache (object_id, local_path, size, present_locally, last_accessed, open_count)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (self.id, self.get_local_full_path(), self.local.size, self.local.present, self.local.last_accessed, self.local.open_count))
+            INSERT INTO drive_cache (object_id, local_path, size, present_locally, last_accessed)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(object_id) DO UPDATE SET
+                local_path = excluded.local_path, size = excluded.size,
+                present_locally = excluded.present_locally, last_accessed = excluded.last_accessed
+        """, (self.id, self.get_local_full_path(), self.local.size, self.local.present, self.local.last_accessed))
 
 class DriveFolder(DriveObject):
     def __init__(self, db, row=None):
@@ -90,21 +95,30 @@ class DriveFile(DriveObject):
     def __init__(self, db, row=None):
         super().__init__(db, row)
 
-    def read_local(self, size, offset):
-        path = self.get_local_full_path()
-        with open(path, 'rb') as f:
-            f.seek(offset)
-            return f.read(size)
-
-    def write_local(self, data, offset):
-        path = self.get_local_full_path()
-        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
-            f.seek(offset)
-            f.write(data)
+    def read_local(self, size, offset, fd=None):
+        """Positional read. Uses fd if given (caller keeps it open), else a transient one."""
+        if fd is not None: return os.pread(fd, size, offset)
+        fd = os.open(self.get_local_full_path(), os.O_RDONLY)
+        try: return os.pread(fd, size, offset)
+        finally: os.close(fd)
+
+    def write_local(self, data, offset, fd=None, known_size=None):
+        """
+        Positional write. Uses fd if given (caller keeps it open), else a transient one.
+        known_size: the file size before this write if the caller tracks it (skips an fstat).
+        """
+        own_fd = fd is None
+        if own_fd: fd = os.open(self.get_local_full_path(), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, data, offset)
+            if known_size is None: size = os.fstat(fd).st_size
+            else: size = max(known_size, offset + len(data))
+        finally:
+            if own_fd: os.close(fd)
         
         # Optimization: Don't commit to DB on every write.
         # Just update in-memory state. Commit happens on release().
-        self.local.size = os.path.getsize(path)
+        self.local.size = size
         self.present_locally = 1
         self.dirty = 1
         self.local_modified_at = int(time.time())
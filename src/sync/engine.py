@@ -197,19 +197,25 @@ class SyncEngine:
     # ----------------------------------------------------------------
     
     def _handle_download_chunk(self, obj, metadata):
+        # A single action may cover a run of adjacent chunks (chunk_count > 1)
         chunk_idx = metadata['chunk_index']
+        chunk_count = metadata.get('chunk_count', 1)
         
-        if self.db.has_chunk(obj.id, chunk_idx): return
+        present = self.db.get_present_chunks(obj.id)
+        wanted = [c for c in range(chunk_idx, chunk_idx + chunk_count) if c not in present]
+        if not wanted: return
+        first, last = wanted[0], wanted[-1]
 
-        start_byte = chunk_idx * CHUNK_SIZE
+        start_byte = first * CHUNK_SIZE
         # Ensure we don't go past file size
-        end_byte = min((chunk_idx + 1) * CHUNK_SIZE - 1, obj.local.size - 1)
+        end_byte = min((last + 1) * CHUNK_SIZE - 1, obj.local.size - 1)
         
         # Guard against zero-byte files or bad math
         if start_byte >= obj.local.size:
-            logger.warning(f"Chunk {chunk_idx} starts at {start_byte} but file size is {obj.local.size}")
+            logger.warning(f"Chunk {first} starts at {start_byte} but file size is {obj.local.size}")
             return
 
+        # One ranged request for the whole run
         data = self.drive_svc.download_file_part(obj.cloud.id, start_byte, end_byte)
         
         local_path = obj.get_local_full_path()
@@ -220,9 +226,10 @@ class SyncEngine:
             f.seek(start_byte)
             f.write(data)
             
-        self.db.add_chunk(obj.id, chunk_idx)
+        self.db.add_chunks(obj.id, range(first, last + 1))
         # Mark as partially present (2) ONLY if not already full (1)
         self.db.execute("UPDATE drive_cache SET present_locally=2, last_accessed=? WHERE object_id=? AND present_locally != 1", (int(time.time()), obj.id))
+        self.db.notify_content(obj.id)
 
     def _pull_drive_folder(self, cloud_id, local_parent_id):
         try:
@@ -289,6 +296,8 @@ class SyncEngine:
                 ))
                 self.db.update_shadow(new_id, cloud_id=c_id, parent_id=local_parent_id, name=name, etag=etag, modified_at=int(time.time()))
 
+        self.db.notify_children(local_parent_id)
+
     def _handle_upload(self, obj, metadata):
         target_name = metadata.get('name', obj.local.name)
         target_hash = metadata.get('file_hash')
@@ -353,6 +362,16 @@ class SyncEngine:
             if not os.path.exists(local_cache_path): raise FileNotFoundError(local_cache_path)
 
             logger.info(f"Uploading '{full_name}' (ID: {obj.id}) to CloudID: {parent_cloud_id}")
+            # The (size, mtime_ns) the shadow may vouch for: with a hash, the stat release() took it at
+            # (None if the file changed mid-hash); without one, the file as it is before the transfer.
+            # Either way _update_db_and_shadow only stores it if the file still matches afterwards.
+            fingerprint = None
+            if target_hash:
+                if metadata.get('local_mtime_ns') is not None:
+                    fingerprint = (metadata.get('local_size'), metadata['local_mtime_ns'])
+            else:
+                st = os.stat(local_cache_path)
+                fingerprint = (st.st_size, st.st_mtime_ns)
             
             with tempfile.TemporaryDirectory() as temp_dir:
                 symlink_path = os.path.join(temp_dir, full_name)
@@ -366,7 +385,7 @@ class SyncEngine:
                     new_size = resp.get('size')
                     
                     if new_cloud_id:
-                        self._update_db_and_shadow(obj, new_cloud_id, new_etag, new_size, target_hash, parent_cloud_id)
+                        self._update_db_and_shadow(obj, new_cloud_id, new_etag, new_size, target_hash, parent_cloud_id, fingerprint=fingerprint)
                 except Exception as e:
                     # Handle 412 Conflict (Precondition Failed) - though pre-check should catch most
                     is_conflict = False
@@ -391,7 +410,7 @@ class SyncEngine:
                                 new_size = resp.get('size')
                                 
                                 if new_cloud_id:
-                                    self._update_db_and_shadow(obj, new_cloud_id, new_etag, new_size, target_hash, parent_cloud_id)
+                                    self._update_db_and_shadow(obj, new_cloud_id, new_etag, new_size, target_hash, parent_cloud_id, fingerprint=fingerprint)
                             else:
                                 raise e
                         except Exception as retry_e:
@@ -550,13 +569,15 @@ class SyncEngine:
         import hashlib
         sha = hashlib.sha256()
         with open(path, 'rb') as f:
+            st = os.fstat(f.fileno()) # The file the hash describes
             while chunk := f.read(8192): sha.update(chunk)
         
         obj.local.present = 1
         obj.local.size = os.path.getsize(path)
         
         # Download doesn't change parent, but we can pass existing one to stay safe
-        self._update_db_and_shadow(obj, obj.cloud.id, obj.cloud.etag, obj.local.size, sha.hexdigest())
+        self._update_db_and_shadow(obj, obj.cloud.id, obj.cloud.etag, obj.local.size, sha.hexdigest(),
+                                   fingerprint=(st.st_size, st.st_mtime_ns))
 
     def _handle_ensure_latest(self, obj):
         if not obj.cloud.id: return
@@ -585,7 +606,7 @@ class SyncEngine:
     # HELPERS
     # ----------------------------------------------------------------
 
-    def _update_db_and_shadow(self, obj, cloud_id, etag, size, file_hash, cloud_parent_id=None):
+    def _update_db_and_shadow(self, obj, cloud_id, etag, size, file_hash, cloud_parent_id=None, fingerprint=None):
         now = int(time.time())
         
         # Construct update query dynamically based on whether cloud_parent_id is provided
@@ -602,12 +623,26 @@ class SyncEngine:
                 WHERE id=?
             """, (cloud_id, etag, size, SYNC_STATE_SYNCHRONIZED, now, obj.id))
         
+        # Fingerprint the local copy so release() can skip rehashing it while unchanged.
+        # fingerprint is the (size, mtime_ns) file_hash was computed at; it is only stored if the
+        # file still matches it, so a write during the transfer isn't mistaken for synced content.
+        local_size, local_mtime_ns = None, None
+        if isinstance(obj, DriveFile) and fingerprint:
+            try:
+                st = os.stat(obj.get_local_full_path())
+                if (st.st_size, st.st_mtime_ns) == tuple(fingerprint):
+                    local_size, local_mtime_ns = fingerprint
+            except FileNotFoundError:
+                pass
+
         self.db.update_shadow(
-            obj.id, cloud_id=cloud_id, etag=etag, file_hash=file_hash, modified_at=now, parent_id=obj.local.parent_id
+            obj.id, cloud_id=cloud_id, etag=etag, file_hash=file_hash, modified_at=now, parent_id=obj.local.parent_id,
+            size=local_size, mtime_ns=local_mtime_ns
         )
         
         if isinstance(obj, DriveFile):
             self.db.execute("UPDATE drive_cache SET present_locally=1, size=? WHERE object_id=?", (size, obj.id))
+            self.db.notify_content(obj.id)
 
     def _cleanup_local(self, obj_id):
         self.db.execute("DELETE FROM objects WHERE id=?", (obj_id,))